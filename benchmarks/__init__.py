@@ -0,0 +1,8 @@
+"""Benchmarks for asv (https://asv.readthedocs.io), configured in ``asv.conf.json``.
+
+``asv run`` stores the time and peak memory of each benchmark for the
+current commit in ``.asv/results``, ``asv continuous master HEAD`` runs
+both commits and reports the significant changes, and ``asv compare A B``
+compares stored results. ``asv run --python=same --quick`` runs everything
+once in the current environment, as a smoke test.
+"""
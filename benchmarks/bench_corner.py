@@ -0,0 +1,121 @@
+import numpy as np
+
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.pyplot as plt
+
+from uplot.corner import Corner
+from uplot.corner.Corner import GaussianCorner
+from uplot.tikz.bases import Memoized, Printable
+from uplot.tikz.corner import PGFCorner, PGFGaussianCorner
+
+
+def gaussians(nbatch: int, ndim: int, seed=42):
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(nbatch, ndim, ndim))
+    return rng.normal(size=(nbatch, ndim)), a @ a.swapaxes(-1, -2) / ndim + np.eye(ndim)
+
+
+def clear_caches(node: Printable):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Memoized):
+            node.invalidate()
+        if isinstance(node, Printable):
+            stack.extend(node.children)
+
+
+class CornerConstruction:
+    params = [2, 4, 8, 16], [False, True]
+    param_names = 'ndim', 'lower_only'
+    # a figure per call, closed in teardown
+    number = 1
+
+    def teardown(self, ndim, lower_only):
+        plt.close('all')
+
+    def time_corner(self, ndim, lower_only):
+        Corner(ndim, truths=[0.] * ndim, lower_only=lower_only)
+
+    def peakmem_corner(self, ndim, lower_only):
+        Corner(ndim, truths=[0.] * ndim, lower_only=lower_only)
+
+
+class GaussianCornerDraw:
+    params = [1, 10, 100]
+    param_names = 'nbatch',
+    ndim = 5
+    # drawing again would add to the artists of the previous draw
+    number = 1
+
+    def setup(self, nbatch):
+        self.mean, self.cov = gaussians(nbatch, self.ndim)
+        self.corner = GaussianCorner(self.ndim, truths=[0.] * self.ndim, lower_only=True)
+
+    def teardown(self, nbatch):
+        plt.close('all')
+
+    def time_draw(self, nbatch):
+        self.corner.draw(self.mean, self.cov)
+
+    def peakmem_draw(self, nbatch):
+        self.corner.draw(self.mean, self.cov)
+
+
+class GaussianCornerUpdate:
+    params = [1, 10, 100], [False, True]
+    param_names = 'nbatch', 'blit'
+    ndim = 5
+
+    def setup(self, nbatch, blit):
+        self.mean, self.cov = gaussians(nbatch, self.ndim)
+        self.corner = GaussianCorner(self.ndim, truths=[0.] * self.ndim, lower_only=True).draw(self.mean, self.cov)
+        # the first blit draws the canvas to save the backgrounds
+        self.corner.update(self.mean, self.cov, blit=blit)
+
+    def teardown(self, nbatch, blit):
+        plt.close('all')
+
+    def time_update(self, nbatch, blit):
+        self.corner.update(self.mean + 0.1, self.cov, blit=blit)
+        if not blit:
+            self.corner.fig.canvas.draw()
+
+
+class PGFGaussianCornerDraw:
+    params = [1, 10, 100, 1000]
+    param_names = 'nbatch',
+    ndim = 5
+
+    def setup(self, nbatch):
+        self.mean, self.cov = gaussians(nbatch, self.ndim)
+
+    def time_draw(self, nbatch):
+        PGFGaussianCorner(self.ndim).draw(self.mean, self.cov)
+
+    def time_draw_radii(self, nbatch):
+        PGFGaussianCorner(self.ndim, ellipse_radii=True).draw(self.mean, self.cov)
+
+    def peakmem_draw(self, nbatch):
+        PGFGaussianCorner(self.ndim).draw(self.mean, self.cov)
+
+
+class PGFCornerRender:
+    params = [1, 10, 100]
+    param_names = 'nbatch',
+    ndim = 5
+
+    def setup(self, nbatch):
+        self.corner = PGFGaussianCorner(self.ndim).draw(*gaussians(nbatch, self.ndim))
+
+    def time_str(self, nbatch):
+        # the formatted options are memoized, so forget them to measure a full render
+        clear_caches(self.corner)
+        str(self.corner)
+
+    def time_str_memoized(self, nbatch):
+        str(self.corner)
+
+    def time_str_empty(self, nbatch):
+        str(PGFCorner(self.ndim))
@@ -0,0 +1,38 @@
+import numpy as np
+
+from uplot.corner import covariance_ellipses
+from uplot.corner.gaussian_corner import covariance_ellipse
+
+
+class CovarianceEllipse:
+    params = [10**3, 10**5, 10**7]
+    param_names = 'n',
+
+    def setup(self, n):
+        rng = np.random.default_rng(42)
+        self.c00, self.c11 = rng.uniform(0.5, 2, size=(2, n))
+        self.c10 = rng.uniform(-0.4, 0.4, size=n)
+
+    def time_covariance_ellipse(self, n):
+        covariance_ellipse(self.c00, self.c11, self.c10)
+
+    def peakmem_covariance_ellipse(self, n):
+        covariance_ellipse(self.c00, self.c11, self.c10)
+
+
+class CovarianceEllipses:
+    params = [10**2, 10**4, 10**5], [4, 10]
+    param_names = 'nbatch', 'ndim'
+
+    def setup(self, nbatch, ndim):
+        a = np.random.default_rng(42).normal(size=(nbatch, ndim, ndim))
+        self.cov = a @ a.swapaxes(-1, -2)
+
+    def time_covariance_ellipses(self, nbatch, ndim):
+        covariance_ellipses(self.cov)
+
+    def time_covariance_ellipses_float32(self, nbatch, ndim):
+        covariance_ellipses(self.cov, dtype=np.float32)
+
+    def peakmem_covariance_ellipses(self, nbatch, ndim):
+        covariance_ellipses(self.cov)
@@ -0,0 +1,64 @@
+import numpy as np
+
+from uplot.tikz.pgfdata import columns_to_pgfdata, table_to_pgfdata, to_pgfdata
+from uplot.tikz.utils import points_to_coords
+
+
+class PointsToCoords:
+    params = [10**2, 10**4, 10**6]
+    param_names = 'npoints',
+
+    def setup(self, npoints):
+        self.points = np.random.default_rng(42).normal(size=(npoints, 2))
+
+    def time_points_to_coords(self, npoints):
+        points_to_coords(self.points, '.4e')
+
+    def peakmem_points_to_coords(self, npoints):
+        points_to_coords(self.points, '.4e')
+
+
+def _columns(nrows: int):
+    rng = np.random.default_rng(42)
+    return {'name': np.char.add('obj', np.arange(nrows).astype(str)),
+            'ra': rng.uniform(0, 360, nrows), 'dec': rng.uniform(-90, 90, nrows),
+            'z': rng.uniform(0, 2, nrows).astype(np.float32), 'n': rng.integers(0, 100, nrows)}
+
+
+class PGFData:
+    params = [10**2, 10**4, 10**5]
+    param_names = 'nrows',
+
+    def setup(self, nrows):
+        self.columns = _columns(nrows)
+        self.rows = [dict(zip(self.columns, row)) for row in zip(*self.columns.values())]
+
+    def time_to_pgfdata(self, nrows):
+        str(to_pgfdata(self.rows))
+
+    def time_columns_to_pgfdata(self, nrows):
+        str(columns_to_pgfdata(self.columns))
+
+    def peakmem_to_pgfdata(self, nrows):
+        str(to_pgfdata(self.rows))
+
+    def peakmem_columns_to_pgfdata(self, nrows):
+        str(columns_to_pgfdata(self.columns))
+
+
+class TableToPGFData:
+    params = [10**2, 10**4, 10**5]
+    param_names = 'nrows',
+
+    def setup(self, nrows):
+        try:
+            from astropy.table import Table
+        except ImportError:
+            raise NotImplementedError('astropy is not installed')
+        self.table = Table(_columns(nrows))
+
+    def time_table_to_pgfdata(self, nrows):
+        str(table_to_pgfdata(self.table, index='name'))
+
+    def peakmem_table_to_pgfdata(self, nrows):
+        str(table_to_pgfdata(self.table, index='name'))
@@ -0,0 +1,67 @@
+"""Import time of the uplot modules, each measured in a fresh interpreter.
+
+Run as ``python benchmarks/import_time.py``. Exits with an error if
+importing any of them pulls in one of the `HEAVY` modules, which should
+only be imported when the functionality that needs them is used.
+
+The same measurements are asv benchmarks: `timeraw_import` and
+`track_heavy_imports`.
+"""
+
+import json
+import subprocess
+import sys
+from statistics import median
+
+
+MODULES = 'uplot', 'uplot.tikz', 'uplot.corner', 'uplot.tikz.corner', 'uplot.tikz.pgfdata'
+HEAVY = 'matplotlib', 'mpl_toolkits', 'scipy', 'sympy', 'torch', 'astropy'
+
+_probe = '''
+import json, sys, time
+before = set(sys.modules)
+t = time.perf_counter()
+import {module}
+t = time.perf_counter() - t
+print(json.dumps([t, sorted({{m.partition('.')[0] for m in set(sys.modules) - before}} & set({heavy!r}))]))
+'''
+
+
+def import_time(module: str, repeat: int = 5):
+    times, heavy = [], set()
+    for _ in range(repeat):
+        t, h = json.loads(subprocess.check_output(
+            (sys.executable, '-c', _probe.format(module=module, heavy=HEAVY))
+        ))
+        times.append(t)
+        heavy.update(h)
+    return median(times), sorted(heavy)
+
+
+def timeraw_import(module):
+    return f'import {module}'
+
+
+def track_heavy_imports(module):
+    return len(import_time(module, repeat=1)[1])
+
+
+for _benchmark in (timeraw_import, track_heavy_imports):
+    _benchmark.params, _benchmark.param_names = list(MODULES), ['module']
+track_heavy_imports.unit = 'modules'
+
+
+def main():
+    baseline, _ = import_time('numpy')
+    print(f'{"numpy":20} {1e3 * baseline:8.1f} ms')
+
+    failed = False
+    for module in MODULES:
+        t, heavy = import_time(module)
+        print(f'{module:20} {1e3 * t:8.1f} ms' + (f'  imports {", ".join(heavy)}' if heavy else ''))
+        failed |= bool(heavy)
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(main())
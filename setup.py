@@ -7,6 +7,6 @@ setup(
     packages=['uplot'],
     install_requires=[
         'frozendict', 'more_itertools',
-        'numpy', 'scipy', 'matplotlib',
+        'numpy', 'matplotlib',
     ],
 )
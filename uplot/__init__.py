@@ -1,25 +1,69 @@
-from typing import Tuple
+from __future__ import annotations
 
+from math import ceil, sqrt
+from typing import Iterable, Tuple, TYPE_CHECKING, Union
+
+import numpy as np
 from frozendict import frozendict
-from matplotlib import pyplot as plt
-from matplotlib.colorbar import Colorbar
-from matplotlib.colors import LinearSegmentedColormap
-from mpl_toolkits.axes_grid1 import make_axes_locatable
 
+from .utils.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.colorbar import Colorbar
+    from matplotlib.colors import Colormap
+    from matplotlib.figure import Figure
+    from matplotlib.image import AxesImage
+    from matplotlib.colors import LinearSegmentedColormap
+
+plt = lazy_import('matplotlib.pyplot')
+mcolors = lazy_import('matplotlib.colors')
+mcm = lazy_import('matplotlib.cm')
+
+
+__all__ = 'imshow_with_cbar', 'imshow_grid', 'traffic', 'midtraffic'
 
-__all__ = 'imshow_with_cbar', 'traffic', 'midtraffic'
+_colormaps = {
+    'traffic': ('forestgreen', 'gold', 'firebrick'),
+    'midtraffic': ((0, 'gold'), (0.5, 'forestgreen'), (0.75, 'orange'), (1, 'firebrick')),
+    'midtraffic2': ((0, 'blue'), (0.5, 'forestgreen'), (0.75, 'orange'), (1, 'firebrick')),
+}
+traffic: LinearSegmentedColormap
+midtraffic: LinearSegmentedColormap
+midtraffic2: LinearSegmentedColormap
 
-traffic = LinearSegmentedColormap.from_list('traffic', ('forestgreen', 'gold', 'firebrick'))
-midtraffic = LinearSegmentedColormap.from_list('midtraffic', ((0, 'gold'), (0.5, 'forestgreen'), (0.75, 'orange'), (1, 'firebrick')))
-midtraffic2 = LinearSegmentedColormap.from_list('midtraffic2', ((0, 'blue'), (0.5, 'forestgreen'), (0.75, 'orange'), (1, 'firebrick')))
+
+def __getattr__(name):
+    # the colormaps are only made (and matplotlib imported) when first used
+    if name in _colormaps:
+        cmap = globals()[name] = mcolors.LinearSegmentedColormap.from_list(name, _colormaps[name])
+        return cmap
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def imshow_with_cbar(img, position='right', size='5%', pad=0.05, cbar_kwargs=frozendict(),
-                     ax: plt.Axes = None, aspect='equal',
-                     **kwargs) -> Tuple[plt.Axes, Colorbar]:
+                     ax: Axes = None, aspect='equal', pyramid: Union[bool, str] = False,
+                     **kwargs) -> Tuple[Axes, Colorbar]:
+    """`imshow` with a colorbar of the same height (or width) next to it.
+
+    With `pyramid` (``True`` or the name of one of the
+    `uplot.utils.pyramid.REDUCTIONS`, e.g. ``'max'``), large images (also
+    memory maps) are shown from a lazily computed mip-map pyramid at the
+    resolution of the current view; see `PyramidView`, which is kept as
+    ``im.pyramid_view``.
+    """
+    from mpl_toolkits.axes_grid1 import make_axes_locatable
+
     if ax is None:
         ax = plt.gca()
-    im = ax.imshow(img, **kwargs)
+    if pyramid:
+        from .utils.pyramid import ImagePyramid, PyramidView
+
+        view = PyramidView(ax, ImagePyramid(img, 'mean' if pyramid is True else pyramid), **kwargs)
+        im = view.image
+        im.pyramid_view = view
+    else:
+        im = ax.imshow(img, **kwargs)
     ax.set_aspect(aspect)
     cax = plt.colorbar(
         im, cax=make_axes_locatable(ax).append_axes(position, size=size, pad=pad),
@@ -29,5 +73,59 @@ def imshow_with_cbar(img, position='right', size='5%', pad=0.05, cbar_kwargs=fro
     if position == 'top':
         cax.ax.xaxis.tick_top()
         cax.ax.xaxis.set_label_position('top')
+    if pyramid:
+        view.update()
 
     return im, cax
+
+
+def _get_cmap(cmap: Union[str, Colormap, None]) -> Colormap:
+    if cmap in _colormaps:
+        return globals().get(cmap) or __getattr__(cmap)
+    return plt.get_cmap(cmap)
+
+
+def imshow_grid(imgs: Iterable, nrows: int = None, ncols: int = None, cmap: Union[str, Colormap] = None,
+                vmin: float = None, vmax: float = None, quantiles: Tuple[float, float] = None,
+                position='right', cbar_kwargs=frozendict(), fig: Figure = None, aspect='equal',
+                **kwargs) -> Tuple[np.ndarray, Colorbar]:
+    """Show `imgs` on a grid of axes with a shared colour scale and a single colorbar.
+
+    The limits of the scale not given as `vmin` and `vmax` are the minimum
+    and maximum over all images or, with `quantiles` (e.g. ``(0.01, 0.99)``),
+    approximate quantiles, found in a single pass with `StreamingLimits`.
+    The images are converted to RGBA through the uint8 lookup table of
+    `cmap` (which can also be ``'traffic'`` or ``'midtraffic'``).
+
+    Returns the ``(nrows, ncols)`` array of images (``None`` past the last
+    one) and the colorbar; the axes are ``[im.axes for im in ...]``.
+    """
+    from .utils.lut import apply_lut, colormap_lut
+    from .utils.sketch import StreamingLimits
+
+    imgs = list(imgs)
+    if vmin is None or vmax is None:
+        limits = StreamingLimits(quantiles=quantiles is not None)
+        for img in imgs:
+            limits.update(img)
+        lo, hi = limits.quantile(quantiles) if quantiles is not None else (limits.min, limits.max)
+        vmin, vmax = lo if vmin is None else vmin, hi if vmax is None else vmax
+    norm = mcolors.Normalize(vmin, vmax)
+    cmap = _get_cmap(cmap)
+    lut = colormap_lut(cmap)
+
+    ncols = ncols or (ceil(len(imgs) / nrows) if nrows else ceil(sqrt(len(imgs))))
+    nrows = nrows or ceil(len(imgs) / ncols)
+    fig = plt.gcf() if fig is None else fig
+    axs = fig.subplots(nrows, ncols, squeeze=False)
+
+    ims = np.full(axs.shape, None, dtype=object)
+    for i, ax in enumerate(axs.flat):
+        if i < len(imgs):
+            ims.flat[i] = ax.imshow(apply_lut(imgs[i], lut, norm), **kwargs)
+            ax.set_aspect(aspect)
+        else:
+            ax.set_axis_off()
+
+    cbar = fig.colorbar(mcm.ScalarMappable(norm, cmap), ax=axs, location=position, **cbar_kwargs)
+    return ims, cbar
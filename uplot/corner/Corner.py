@@ -1,57 +1,112 @@
+from __future__ import annotations
+
 import typing as tp
+from itertools import chain
+from math import pi, sqrt
 
-import matplotlib
 import numpy as np
-import scipy.stats
 from frozendict import frozendict
-from matplotlib import pyplot as plt
-from matplotlib.collections import PatchCollection
-from matplotlib.lines import Line2D
-from matplotlib.patches import Ellipse
-from matplotlib.ticker import Formatter, Locator
 
-from .abstractcorner import AbstractCorner, AbstractGaussianCorner
-from .gaussian_corner import covariance_ellipse
-from ..utils import unshare, vfloat
+from .abstractcorner import AbstractCorner, AbstractGaussianCorner, AbstractSampleCorner, GaussianDrawPlan
+from .gaussian_corner import covariance_ellipses
+from ..utils import set_major, unshare, vfloat
+from ..utils.lazy import lazy_import
+from ..utils.profiling import instrumented
+
+if tp.TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import Formatter, Locator
+
+plt = lazy_import('matplotlib.pyplot')
+mcollections = lazy_import('matplotlib.collections')
+mcolors = lazy_import('matplotlib.colors')
+mlines = lazy_import('matplotlib.lines')
+mpatches = lazy_import('matplotlib.patches')
 
 
-class Corner(AbstractCorner[plt.Axes]):
-    fig: plt.Figure
+class Corner(AbstractCorner['Axes']):
+    fig: Figure
 
+    @instrumented
     def __init__(self, ndim=None, names=None, truths=None, labels=None,
                  truth_options=frozendict(), label_options=frozendict(), axs=None,
-                 diag_locator: tp.Union[tp.Type[Locator], Locator] = plt.AutoLocator,
-                 diag_formatter: tp.Union[tp.Type[Formatter], Formatter] = plt.NullFormatter,
-                 **subplots_kwargs):
+                 diag_locator: tp.Union[tp.Type[Locator], Locator] = None,
+                 diag_formatter: tp.Union[tp.Type[Formatter], Formatter] = None,
+                 lower_only=False, **subplots_kwargs):
+        """
+        The diagonal y axes get `diag_locator` and `diag_formatter` (by
+        default an `AutoLocator` and a `NullFormatter`).
+
+        With `lower_only`, only the axes in the lower triangle (including the
+        diagonal) are created, and the entries above the diagonal in `axs`
+        are None. This is much faster for many dimensions since the
+        diagonal axes never join the shared y axes of their row and so need
+        not be unshared.
+        """
         super().__init__(ndim=ndim, names=names, truths=truths, labels=labels,
                          truth_options=truth_options, label_options=label_options, axs=axs)
 
         if self.axs is None:
-            self.fig, self.axs = plt.subplots(self.ndim, self.ndim, sharex='col', sharey='row', **subplots_kwargs)
+            self.fig, self.axs = (self._lower_subplots(self.ndim, **subplots_kwargs) if lower_only else
+                                  plt.subplots(self.ndim, self.ndim, sharex='col', sharey='row', **subplots_kwargs))
         else:
             self.fig = self.axs[0, 0].figure
 
         for ax in self.axs[np.triu_indices(self.ndim, 1)]:
-            ax.remove()
+            if ax is not None:
+                ax.remove()
         for ax in self.iter_diag:
-            unshare(ax, 'y', diag_locator, diag_formatter)
+            if lower_only:
+                set_major(ax.yaxis, diag_locator, diag_formatter)
+            else:
+                unshare(ax, 'y', diag_locator, diag_formatter)
             ax.yaxis.set_visible(True)
             ax.set_ylim(0)
 
         self.draw_truths(**self.truth_options)
         self.draw_labels(**self.label_options)
 
-    _draw_label_x = staticmethod(plt.Axes.set_xlabel)
-    _draw_label_y = staticmethod(plt.Axes.set_ylabel)
-    _draw_truth_diag = staticmethod(plt.Axes.axvline)
+    @staticmethod
+    def _lower_subplots(ndim, gridspec_kw=None, subplot_kw=None, width_ratios=None, height_ratios=None,
+                        **fig_kw) -> tp.Tuple[Figure, np.ndarray]:
+        # like plt.subplots(ndim, ndim, sharex='col', sharey='row') on the lower triangle, but
+        # the x axes are shared with the diagonal, and the diagonal y axes are not shared
+        fig = plt.figure(**fig_kw)
+        gs = fig.add_gridspec(ndim, ndim, width_ratios=width_ratios, height_ratios=height_ratios, **(gridspec_kw or {}))
+
+        axs = np.empty((ndim, ndim), dtype=object)
+        for i, j in zip(*np.tril_indices(ndim)):
+            axs[i, j] = fig.add_subplot(gs[i, j], sharex=axs[j, j] if i > j else None,
+                                        sharey=axs[i, 0] if 0 < j < i else None, **(subplot_kw or {}))
+        for ax in axs[np.tril_indices(ndim)]:
+            ax.label_outer()
+        return fig, axs
+
+    @staticmethod
+    def _draw_label_x(ax: Axes, label, **kwargs):
+        return ax.set_xlabel(label, **kwargs)
+
+    @staticmethod
+    def _draw_label_y(ax: Axes, label, **kwargs):
+        return ax.set_ylabel(label, **kwargs)
+
+    @staticmethod
+    def _draw_truth_diag(ax: Axes, truth, **kwargs):
+        return ax.axvline(truth, **kwargs)
 
     @staticmethod
-    def _draw_truth_offdiag(ax: plt.Axes, truth_x, truth_y, **kwargs):
+    def _draw_truth_offdiag(ax: Axes, truth_x, truth_y, **kwargs):
         ax.axvline(truth_x, **kwargs)
         ax.axhline(truth_y, **kwargs)
 
 
-class GaussianCorner(AbstractGaussianCorner[plt.Axes], Corner):
+class GaussianCorner(AbstractGaussianCorner['Axes'], Corner):
+    # per panel, the background for blitting: the axes without the Gaussians
+    _backgrounds: tp.Optional[tp.List] = None
+    # of the draw_event handler that saves them
+    _draw_cid: int = None
+
     @property
     def _x(self):
         return self.__x
@@ -69,28 +124,224 @@ class GaussianCorner(AbstractGaussianCorner[plt.Axes], Corner):
 
     @staticmethod
     def _get_y(x):
-        return scipy.stats.norm.pdf(x)
+        return np.exp(-x**2 / 2) / sqrt(2*pi)
 
     __x = np.linspace(-5, 5)
     __y = _get_y.__func__(__x)
 
     def _draw_hist(self, m, v, _options=frozendict(), **options):
         scale = np.sqrt(v)
-        return plt.Line2D(m + scale * self._x, self._y / scale, **{**options, **_options})
+        return mlines.Line2D(m + scale * self._x, self._y / scale, **{**options, **_options})
     
     def _draw_contour(self, x, y, w=1., h=1., angle=0., levels=(1.,), level_kwargs=(frozendict(),), _options=frozendict(), **options):
-        return PatchCollection([
-            Ellipse((x, y), * 2*level*np.array((w, h)), np.rad2deg(angle), **{**options, **_options, **lkwargs})
+        return mcollections.PatchCollection([
+            mpatches.Ellipse((x, y), * 2*level*np.array((w, h)), np.rad2deg(angle), **{**options, **_options, **lkwargs})
             for level, lkwargs in zip(levels, level_kwargs)
         ], match_original=True)
 
+    # Line2D properties that a LineCollection can reproduce per line
+    _batched_hist_options = frozenset(('color', 'c', 'alpha', 'linewidth', 'lw', 'linestyle', 'ls', 'antialiased', 'aa', 'zorder'))
+
+    @staticmethod
+    def _per_element(values: tp.Sequence, index: np.ndarray):
+        # a single value lets matplotlib skip per-element processing (e.g. of dashes)
+        if len(set(map(repr, values))) == 1:
+            return values[0]
+        try:
+            return np.asarray(values, dtype=float)[index.reshape(-1)]
+        except (TypeError, ValueError):  # e.g. linestyles
+            return [values[i] for i in index.flat]
+
+    @instrumented
+    def draw_hist(self, plan: GaussianDrawPlan):
+        """Draw one `LineCollection` per diagonal panel for the whole batch.
+
+        Falls back to one `Line2D` per element if the options include
+        properties that cannot be set per line in a collection.
+        """
+        protos = [mlines.Line2D((), (), **o) for o in plan.hist_styles]
+        # Line2D caps and joins dashed lines differently, but a collection has a single style
+        ends = {(p.get_dash_capstyle(), p.get_dash_joinstyle()) if p.is_dashed()
+                else (p.get_solid_capstyle(), p.get_solid_joinstyle()) for p in protos}
+        if (not all(self._batched_hist_options.issuperset(o.keys()) for o in plan.hist_styles)
+                or len({p.get_zorder() for p in protos}) > 1 or len(ends) > 1):
+            return super().draw_hist(plan)
+        (capstyle, joinstyle), = ends
+
+        segments = self._hist_segments(plan)
+
+        props = {key: self._per_element(values, plan.hist_style) for key, values in dict(
+            colors=[mcolors.to_rgba(p.get_color(), p.get_alpha()) for p in protos],
+            linewidths=[p.get_linewidth() for p in protos],
+            linestyles=[o.get('linestyle', o.get('ls', p.get_linestyle())) for o, p in zip(plan.hist_styles, protos)],
+            antialiaseds=[p.get_antialiased() for p in protos],
+        ).items()}
+        return [[mcollections.LineCollection(segs, **props, zorder=protos[0].get_zorder(),
+                                capstyle=capstyle, joinstyle=joinstyle)]
+                for segs in segments]
+
+    @instrumented
+    def draw_contour(self, plan: GaussianDrawPlan):
+        """Draw one `EllipseCollection` per off-diagonal panel for the whole batch.
+
+        The ellipses are styled as the `Ellipse` patches of `_draw_contour`
+        would be in a ``PatchCollection(match_original=True)``.
+        """
+        # one style per (element style, level) combination, ellipses ordered element-major
+        nlevels = plan.levels.shape[-1]
+        combo = plan.contour_style[:, None] * nlevels + np.arange(nlevels)
+        protos = [mpatches.Ellipse((0, 0), 1, 1, **{**style, **lkw})
+                  for style in plan.contour_styles for lkw in plan.level_options]
+        props = {key: self._per_element(values, combo) for key, values in dict(
+            facecolors=[tuple(p.get_facecolor()) if p.get_fill() else (0, 0, 0, 0) for p in protos],
+            edgecolors=[tuple(p.get_edgecolor()) for p in protos],
+            linewidths=[p.get_linewidth() for p in protos],
+            linestyles=[p.get_linestyle() for p in protos],
+            antialiaseds=[p.get_antialiased() for p in protos],
+        ).items()}
+
+        return [[mcollections.EllipseCollection(*(a.reshape(-1) for a in args), units='xy', offsets=offs.reshape(-1, 2), **props)]
+                for *args, offs in zip(*self._contour_geometry(plan))]
+
+    def _hist_segments(self, plan: GaussianDrawPlan) -> np.ndarray:
+        # (ndim, nbatch, npoints, 2)
+        scale = np.sqrt(plan.var)[..., None]
+        return np.stack(np.broadcast_arrays(plan.mean[..., None] + scale * self._x, self._y / scale), -1)
+
+    @staticmethod
+    def _contour_geometry(plan: GaussianDrawPlan) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # widths, heights and angles (in degrees) of shape (npairs, nbatch, nlevels), and offsets with a final (x, y) axis
+        w, h, angle = (a[..., None] for a in plan.ellipses)
+        widths, heights = 2 * plan.levels * w, 2 * plan.levels * h
+        angles = np.broadcast_to(np.rad2deg(angle), widths.shape)
+        offsets = np.stack(np.broadcast_arrays(*plan.centres[..., None], widths)[:2], -1)
+        return widths, heights, angles, offsets
+
+    @instrumented
+    def update_hist(self, drawn, plan: GaussianDrawPlan):
+        for elements, segs in zip(drawn, self._hist_segments(plan)):
+            if len(elements) == 1 and isinstance(elements[0], mcollections.LineCollection):
+                elements[0].set_segments(segs)
+            else:
+                for line, seg in zip(elements, segs):
+                    line.set_data(*seg.T)
+        return drawn
+
+    @instrumented
+    def update_contour(self, drawn, plan: GaussianDrawPlan):
+        for (collection,), *args, offs in zip(drawn, *self._contour_geometry(plan)):
+            widths, heights, angles = (a.reshape(-1) for a in args)
+            if hasattr(collection, 'set_widths'):
+                collection.set_widths(widths)
+                collection.set_heights(heights)
+                collection.set_angles(angles)
+            else:  # matplotlib < 3.8: as set by EllipseCollection.__init__
+                collection._widths, collection._heights, collection._angles = 0.5 * widths, 0.5 * heights, np.deg2rad(angles)
+            collection.set_offsets(offs.reshape(-1, 2))
+        return drawn
+
     def _get_ellipse_args(self, cov):
-        return covariance_ellipse(*self._get_cov_elements(cov))
+        return covariance_ellipses(cov, self.jl, self.il, batch_at_front=False)
+
+    def _dimension_transform(self, i):
+        # EllipseCollection(units='xy') sizes are in the coordinates after the axis scale's transform
+        transform = self.axs[-1, i].xaxis.get_transform()
+        return None if transform.is_affine else lambda x: transform.transform(x.reshape(-1, 1)).reshape(x.shape)
 
+    @instrumented
     def _draw(self, _drawing):
         for ax, elements in _drawing:
             for element in elements:
-                if isinstance(element, matplotlib.collections.Collection):
+                if isinstance(element, mcollections.EllipseCollection):
+                    element.set_offset_transform(ax.transData)
+                if isinstance(element, mcollections.Collection):
                     ax.add_collection(element)
-                elif isinstance(element, Line2D):
+                elif isinstance(element, mlines.Line2D):
                     ax.add_line(element)
+                if self._draw_cid is not None:
+                    element.set_animated(True)
+        # of the previous Gaussians
+        self._backgrounds = None
+
+    def update(self, mean, cov, lims=False, blit=False):
+        """See `AbstractGaussianCorner.update`.
+
+        With `blit` (and kept limits), only the panels are redrawn, over
+        backgrounds saved at the last full draw of the canvas, which is much
+        faster than redrawing the figure. For this, the Gaussians become
+        animated: on full draws, including `savefig`, they are drawn last,
+        above the other artists.
+        """
+        super().update(mean, cov, lims)
+        if not (blit and lims is False and self._blit()):
+            self.fig.canvas.draw_idle()
+        return self
+
+    def _relim(self):
+        for ax, elements in self._panels():
+            ax.relim()
+            for element in elements:
+                if isinstance(element, mcollections.Collection):  # not included by relim
+                    ax.update_datalim(element.get_datalim(ax.transData).get_points())
+
+    def _panels(self):
+        return zip(chain(self.iter_diag, self.iter_offdiag), self._drawn)
+
+    def _blit(self) -> bool:
+        canvas = self.fig.canvas
+        if not canvas.supports_blit:
+            return False
+        if self._draw_cid is None:
+            for _, elements in self._panels():
+                for element in elements:
+                    element.set_animated(True)
+            self._draw_cid = canvas.mpl_connect('draw_event', self._on_draw)
+        if self._backgrounds is None:
+            canvas.draw()
+        if self._backgrounds is None:
+            return False
+
+        for (ax, elements), background in zip(self._panels(), self._backgrounds):
+            canvas.restore_region(background)
+            for element in elements:
+                ax.draw_artist(element)
+            canvas.blit(ax.bbox)
+        return True
+
+    def _on_draw(self, event):
+        # animated artists are skipped by full draws: save the backgrounds and draw them on top
+        renderer = event.renderer
+        if event.canvas is self.fig.canvas and not event.canvas.is_saving() and hasattr(renderer, 'copy_from_bbox'):
+            self._backgrounds = [renderer.copy_from_bbox(ax.bbox) for ax, _ in self._panels()]
+        for _, elements in self._panels():
+            for element in elements:
+                element.draw(renderer)
+
+
+class SampleCorner(AbstractSampleCorner['Axes'], Corner):
+    @staticmethod
+    def _draw_hist1d(ax: Axes, edges, hist, **options):
+        return ax.stairs(hist, edges, **options)
+
+    @staticmethod
+    def _draw_hist2d(ax: Axes, xedges, yedges, hist, **options):
+        return ax.pcolormesh(xedges, yedges, hist, **{'cmap': 'Greys', **options})
+
+    @staticmethod
+    def _update_hist1d(ax: Axes, artist, edges, hist):
+        artist.set_data(hist)
+        ax.relim()
+        ax.autoscale(axis='y')
+        ax.set_ylim(0, None)
+        return artist
+
+    def _update_hist2d(self, ax: Axes, artist, xedges, yedges, hist):
+        artist.set_array(hist)
+        if not self.hist2d_options.keys() & {'norm', 'vmin', 'vmax'}:
+            artist.autoscale()
+        return artist
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.fig.canvas.draw_idle()
+        return self
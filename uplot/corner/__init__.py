@@ -1,2 +1,4 @@
 from .Corner import Corner
-from .gaussian_corner import gaussian_corner
+from .frames import frame_lims, render_frames
+from .gaussian_corner import covariance_ellipses, gaussian_corner, trellipse
+from .sample_corner import sample_corner
@@ -1,12 +1,15 @@
 import typing as tp
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from itertools import chain, count, repeat
 from operator import itemgetter
 
 import numpy as np
 from frozendict import frozendict
 
-from ..utils import _move_batch_mat, _move_batch_vec, _rowwise_combinations, _to_nd_obj_array
+from .sample_corner import DEFAULT_CHUNKSIZE, sample_corner, sample_corner_edges
+from ..utils import _intern, _move_batch_mat, _move_batch_vec, _rowwise_combinations, _to_nd_obj_array
+from ..utils.profiling import instrumented
 
 
 class AbstractAxis(ABC):
@@ -26,6 +29,7 @@ _AxisType = tp.TypeVar('_AxisType')
 
 
 class AbstractCorner(ABC, tp.Generic[_AxisType]):
+    @instrumented
     def __init__(self, ndim: int = None, names: tp.Iterable[str] = None,
                  truths: tp.Union[tp.Iterable[float], tp.Mapping[str, float]] = None,
                  labels: tp.Union[tp.Iterable[str], tp.Mapping[str, str]] = None,
@@ -69,6 +73,7 @@ class AbstractCorner(ABC, tp.Generic[_AxisType]):
     def _draw_label_y(self, ax: _AxisType, label: str, **kwargs) -> None:
         raise NotImplementedError()
 
+    @instrumented
     def draw_truths(self, **kwargs):
         for (i, j), ax in self.enum_all:
             if i == j:
@@ -76,6 +81,7 @@ class AbstractCorner(ABC, tp.Generic[_AxisType]):
             else:
                 self._draw_truth_offdiag(ax, self.truths[self.names[j]], self.truths[self.names[i]], **kwargs)
 
+    @instrumented
     def draw_labels(self, **kwargs):
         kwargs = {**self.label_options, **kwargs}
         for i, label in enumerate(self.labels.values()):
@@ -83,6 +89,16 @@ class AbstractCorner(ABC, tp.Generic[_AxisType]):
                 self._draw_label_y(self.axs[i, 0], label, **kwargs)
             self._draw_label_x(self.axs[-1, i], label, **kwargs)
 
+    @instrumented
+    def set_lims(self, lims: np.ndarray):
+        for (i, j), ax in self.enum_all:
+            ax.set_xlim(*lims[j])
+            if i > j:
+                ax.set_ylim(*lims[i])
+            else:
+                ax.autoscale(axis='y')
+                ax.set_ylim(0, None)
+
     @property
     def iter_diag(self) -> tp.Iterable[_AxisType]:
         yield from self.axs.diagonal()
@@ -108,16 +124,57 @@ class AbstractCorner(ABC, tp.Generic[_AxisType]):
         yield from map(itemgetter(-1), self.enum_all)
 
 
-class AbstractGaussianCorner(AbstractCorner[_AxisType], ABC):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+@dataclass
+class GaussianDrawPlan:
+    """The data for drawing a batch of Gaussians, as plain arrays.
+
+    The batch dimensions are flattened into the last axis of all per-panel
+    arrays. Options are interned: batch element ``b`` is drawn with
+    ``hist_styles[hist_style[b]]`` on the diagonal and with
+    ``contour_styles[contour_style[b]]`` off it, where level ``l`` of its
+    contours further gets ``level_options[l]``.
+    """
+
+    mean: np.ndarray  # (ndim, nbatch)
+    var: np.ndarray  # (ndim, nbatch)
+    centres: np.ndarray  # (2, npairs, nbatch): the x and y means in the off-diagonal panels
+    ellipses: tp.Tuple[np.ndarray, ...]  # backend-specific (see _get_ellipse_args), each (npairs, nbatch)
+    levels: np.ndarray  # (nbatch, nlevels)
+    level_options: tp.Tuple[tp.Mapping, ...]
+    hist_styles: tp.List[tp.Mapping]
+    hist_style: np.ndarray  # (nbatch,)
+    contour_styles: tp.List[tp.Mapping]
+    contour_style: np.ndarray  # (nbatch,)
 
-        self.draw_hist = np.vectorize(self._draw_hist, excluded='self', otypes=(object,),)
-        self.draw_contour = np.vectorize(self._draw_contour, excluded='self', otypes=(object,),)
+    @property
+    def nbatch(self):
+        return self.mean.shape[-1]
 
-    @staticmethod
-    def _1d_iter(arr):
-        return np.reshape(arr, (len(arr), -1))
+
+class AbstractGaussianCorner(AbstractCorner[_AxisType], ABC):
+    lims: np.ndarray = None
+    # what the last draw drew in each panel (diagonal, then off-diagonal)
+    _drawn: tp.List[tp.Sequence] = None
+
+    @instrumented
+    def draw_hist(self, plan: GaussianDrawPlan) -> tp.Iterable[tp.Sequence]:
+        """Draw the 1D marginals from the `plan`.
+
+        Returns, for each diagonal panel, the objects to be drawn in it.
+        By default, these are the results of `_draw_hist` for each batch
+        element; backends can override this to draw whole batches at once.
+        """
+        styles = plan.hist_styles
+        return [[self._draw_hist(m, v, **styles[s]) for m, v, s in zip(ms, vs, plan.hist_style)]
+                for ms, vs in zip(plan.mean, plan.var)]
+
+    @instrumented
+    def draw_contour(self, plan: GaussianDrawPlan) -> tp.Iterable[tp.Sequence]:
+        """Like `draw_hist` but for the off-diagonal panels, using `_draw_contour`."""
+        styles = plan.contour_styles
+        return [[self._draw_contour(x, y, *args, levels=levels, level_kwargs=plan.level_options, **styles[s])
+                 for x, y, *args, levels, s in zip(xs, ys, *es, plan.levels, plan.contour_style)]
+                for xs, ys, *es in zip(*plan.centres, *plan.ellipses)]
 
     @abstractmethod
     def _draw_hist(self, m: float, v: float, _options=frozendict(), **options):
@@ -140,6 +197,97 @@ class AbstractGaussianCorner(AbstractCorner[_AxisType], ABC):
     def _draw(self, _drawing: tp.Iterable[tp.Tuple[_AxisType, tp.Any]]):
         raise NotImplementedError()
 
+    def _dimension_transform(self, i: int) -> tp.Optional[tp.Callable[[np.ndarray], np.ndarray]]:
+        """How the axes transform dimension `i` (e.g. `np.log`), or None if linearly."""
+        return None
+
+    def _local_scales(self, mean: np.ndarray, var: np.ndarray) -> tp.Optional[np.ndarray]:
+        # the derivatives of the axes transforms at the means, or None if all are linear
+        transforms = [self._dimension_transform(i) for i in range(self.ndim)]
+        if all(f is None for f in transforms):
+            return None
+        steps = 1e-4 * np.sqrt(var)
+        return np.stack([np.ones_like(m) if f is None else (f(m + d) - f(m - d)) / (2 * d)
+                         for f, m, d in zip(transforms, mean, steps)])
+
+    @staticmethod
+    def _plan_styles(batch_shape, _options: np.ndarray, options: tp.Mapping[str, np.ndarray]) -> tp.Tuple[tp.List[tp.Mapping], np.ndarray]:
+        # intern each source separately (most are not batched) and then the combinations
+        keys = tuple(options.keys())
+        uniques, codes = zip(*(
+            (unique, np.broadcast_to(inverse.reshape(a.shape), batch_shape).reshape(-1))
+            for a in (_options, *options.values())
+            for unique, inverse in [_intern(a.flat)]
+        ))
+        if all(len(unique) == 1 for unique in uniques):
+            combos, inverse = np.zeros((1, len(codes)), dtype=int), np.zeros(int(np.prod(batch_shape)), dtype=int)
+        else:
+            combos, inverse = np.unique(np.stack(codes, -1), axis=0, return_inverse=True)
+        return [{**{key: u[c] for key, u, c in zip(keys, uniques[1:], combo[1:])}, **uniques[0][combo[0]]}
+                for combo in combos], inverse.reshape(-1)
+
+    @instrumented
+    def plan(self, mean: np.ndarray, cov: np.ndarray,
+             sigma_levels: tp.Tuple[float] = (3, 2, 1),
+             hist1d_options=frozendict(), contour_options=frozendict(), _options: tp.Tuple[tp.Mapping] = ({},),
+             contour_level_options: tp.Tuple[tp.Mapping] = None,
+             batch_at_front=True, **extra_options) -> GaussianDrawPlan:
+        """Prepare a `GaussianDrawPlan` (see `draw` for the arguments).
+
+        Option values (and `_options`) are given per batch element along
+        their leading axes (as many as there are batch dimensions) and are
+        broadcast against the batch shape. `sigma_levels` broadcasts against
+        ``(*batch_shape, nlevels)``.
+
+        On nonlinear (e.g. log) axes, the ellipses are those of the
+        Gaussian linearised around its mean in the transformed coordinates.
+        """
+        if batch_at_front:
+            mean, cov = _move_batch_vec(mean), _move_batch_mat(cov)
+        if mean.ndim == 1:
+            mean, cov = mean[..., None], cov[..., None]
+
+        batch_shape = mean.shape[1:]
+        nbatch = len(batch_shape)
+
+        sigma_levels = np.asarray(sigma_levels)
+        if contour_level_options is None:
+            contour_level_options = sigma_levels.shape[-1] * ({},)
+        _options = _to_nd_obj_array(np.array(_options), nbatch)
+        hist1d_options, contour_options = (
+            {key: _to_nd_obj_array(np.array(val), nbatch) for key, val in {**extra_options, **d}.items()}
+            for d in (hist1d_options, contour_options))
+
+        hist_styles, hist_style = self._plan_styles(batch_shape, _options, hist1d_options)
+        contour_styles, contour_style = self._plan_styles(batch_shape, _options, contour_options)
+
+        var = np.moveaxis(np.diagonal(cov), -1, 0)
+        scales = self._local_scales(mean, var)
+        if scales is not None:
+            cov = cov * scales[:, None] * scales[None, :]
+
+        return GaussianDrawPlan(
+            mean=mean.reshape(len(mean), -1),
+            var=var.reshape(len(mean), -1),
+            centres=mean[self.idxl[::-1]].reshape(2, len(self.il), -1),
+            ellipses=tuple(a.reshape(len(self.il), -1) for a in self._get_ellipse_args(cov)),
+            levels=np.broadcast_to(sigma_levels, (*batch_shape, sigma_levels.shape[-1])).reshape(-1, sigma_levels.shape[-1]),
+            level_options=tuple(contour_level_options),
+            hist_styles=hist_styles, hist_style=hist_style,
+            contour_styles=contour_styles, contour_style=contour_style
+        )
+
+    @instrumented
+    def _default_lims(self, plan: GaussianDrawPlan, nsigma: float, pad_fraction: float,
+                      collapse_functions: tp.Tuple[tp.Callable[[np.ndarray], np.ndarray], tp.Callable[[np.ndarray], np.ndarray]]):
+        lims = np.stack([
+            f(a, axis=-1) for f, a in zip(collapse_functions, (
+                plan.mean + np.sqrt(plan.var) * sign * nsigma for sign in (-1, 1)))
+        ], -1)
+        lims += np.diff(lims, axis=-1) * (-1, 1) * pad_fraction
+        return lims
+
+    @instrumented
     def draw(self, mean: np.ndarray, cov: np.ndarray, lims=None,
              sigma_levels: tp.Tuple[float] = (3, 2, 1),
              hist1d_options=frozendict(), contour_options=frozendict(), _options: tp.Tuple[tp.Mapping] = ({},),
@@ -147,41 +295,142 @@ class AbstractGaussianCorner(AbstractCorner[_AxisType], ABC):
              batch_at_front=True, lims_nsigma=3., lims_pad_fraction=0.02,
              lims_collapse_functions: tp.Tuple[tp.Callable[[np.ndarray], np.ndarray], tp.Callable[[np.ndarray], np.ndarray]] = (np.min, np.max),
              **extra_options):
-        if batch_at_front:
-            mean, cov = _move_batch_vec(mean), _move_batch_mat(cov)
+        self._plan_kwargs = dict(sigma_levels=sigma_levels,
+                                 hist1d_options=hist1d_options, contour_options=contour_options, _options=_options,
+                                 contour_level_options=contour_level_options, batch_at_front=batch_at_front, **extra_options)
+        self._lims_args = lims_nsigma, lims_pad_fraction, lims_collapse_functions
+        plan = self.plan(mean, cov, **self._plan_kwargs)
 
         if lims is None:
-            lims = np.stack([
-                f(a.reshape(len(a), -1), axis=-1)
-                for f, a in zip(lims_collapse_functions,
-                                np.moveaxis(mean[..., None] + np.sqrt(np.moveaxis(cov.diagonal(), -1, 0))[..., None] * (-1, 1) * lims_nsigma, -1, 0))
-            ], -1)
-            lims += np.diff(lims, axis=-1) * (-1, 1) * lims_pad_fraction
-
-        nbatch = mean.ndim - 1
-        sigma_levels, contour_level_options = (
-            _to_nd_obj_array(np.array(arr), nbatch - 1)
-            for arr in
-            (sigma_levels, contour_level_options if contour_level_options is not None else len(sigma_levels) * ({},))
-        )
-        _options = _to_nd_obj_array(np.array(_options), nbatch)
-        hist1d_options, contour_options, extra_options = (
-            {key: _to_nd_obj_array(np.array(val), nbatch) for key, val in d.items()}
-            for d in (hist1d_options, contour_options, extra_options))
+            lims = self._default_lims(plan, *self._lims_args)
+        self.lims = None if lims is False else np.asarray(lims)
+
+        self._drawn = list(chain(self.draw_hist(plan), self.draw_contour(plan)))
+        self._nbatch = plan.nbatch
+        self._draw(zip(chain(self.iter_diag, self.iter_offdiag), self._drawn))
+
+        if lims is not False:
+            self.set_lims(lims)
+
+        return self
+
+    @abstractmethod
+    def update_hist(self, drawn: tp.Sequence[tp.Sequence], plan: GaussianDrawPlan) -> tp.Iterable[tp.Sequence]:
+        """Set what `draw_hist` returned (`drawn`) to the `plan`, and return what is drawn now."""
+        raise NotImplementedError()
 
-        self._draw(zip(chain(self.iter_diag, self.iter_offdiag),
-                       chain(self._1d_iter(self.draw_hist(mean, _move_batch_vec(np.diagonal(cov)), _options=_options, **{**extra_options, **hist1d_options})),
-                             self._1d_iter(self.draw_contour(
-                                 *mean[self.idxl[::-1]], *self._get_ellipse_args(cov),
-                                 sigma_levels, contour_level_options, _options=_options, **{**extra_options, **contour_options})))))
+    @abstractmethod
+    def update_contour(self, drawn: tp.Sequence[tp.Sequence], plan: GaussianDrawPlan) -> tp.Iterable[tp.Sequence]:
+        """Like `update_hist` for what `draw_contour` returned."""
+        raise NotImplementedError()
+
+    @instrumented
+    def update(self, mean: np.ndarray, cov: np.ndarray, lims=False):
+        """Move the Gaussians of the last `draw` to `mean` and `cov`, changing what it drew in place.
 
+        The batch shape and the options are those given to `draw`. The
+        limits (also of the diagonal panels) are kept, unless given `lims`,
+        or None for the default limits of the new Gaussians.
+        """
+        if self._drawn is None:
+            raise RuntimeError('draw() must be called before update().')
+        plan = self.plan(mean, cov, **self._plan_kwargs)
+        if plan.nbatch != self._nbatch:
+            raise ValueError(f'Expected a batch of {self._nbatch} Gaussians, as drawn, but got {plan.nbatch}.')
+
+        if lims is None:
+            lims = self._default_lims(plan, *self._lims_args)
         if lims is not False:
-            for (i, j), ax in self.enum_all:
-                ax.set_xlim(*lims[j])
-                if i > j:
-                    ax.set_ylim(*lims[i])
-                else:
-                    ax.autoscale(axis='y')
-                    ax.set_ylim(0, None)
+            self.lims = np.asarray(lims)
+
+        ndim = self.ndim
+        self._drawn = list(chain(self.update_hist(self._drawn[:ndim], plan),
+                                 self.update_contour(self._drawn[ndim:], plan)))
+
+        if lims is not False:
+            self._relim()
+            self.set_lims(lims)
+
+        return self
+
+    def _relim(self):
+        """Make the axes aware of the data changed by `update` before they are autoscaled."""
+
+
+class AbstractSampleCorner(AbstractCorner[_AxisType], ABC):
+    edges: np.ndarray = None
+    hist1d: np.ndarray = None
+    hist2d: np.ndarray = None
+    density: bool = True
+
+    @abstractmethod
+    def _draw_hist1d(self, ax: _AxisType, edges: np.ndarray, hist: np.ndarray, **options):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _draw_hist2d(self, ax: _AxisType, xedges: np.ndarray, yedges: np.ndarray, hist: np.ndarray, **options):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _update_hist1d(self, ax: _AxisType, artist, edges: np.ndarray, hist: np.ndarray):
+        """Set the values of an `artist` from `_draw_hist1d` and return it (or its replacement)."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _update_hist2d(self, ax: _AxisType, artist, xedges: np.ndarray, yedges: np.ndarray, hist: np.ndarray):
+        raise NotImplementedError()
+
+    @staticmethod
+    def _density1d(edges: np.ndarray, hist1d: np.ndarray):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return hist1d / np.diff(edges, axis=-1) / np.sum(hist1d, axis=-1, keepdims=True)
+
+    def _hist1d_values(self, i):
+        return self._density1d(self.edges[i], self.hist1d[i]) if self.density else self.hist1d[i]
+
+    def draw(self, samples: np.ndarray, weights: np.ndarray = None, bins: tp.Union[int, np.ndarray] = 20,
+             range: np.ndarray = None, density=True, lims=None,
+             hist1d_options=frozendict(), hist2d_options=frozendict(),
+             chunksize: int = DEFAULT_CHUNKSIZE):
+        """Draw the histograms of (nsamples, ndim) `samples`.
+
+        The histograms are accumulated in chunks of `chunksize` samples (see
+        `sample_corner`), so `samples` (and `weights`) can be memory-mapped.
+        The 1D histograms are normalised to densities if `density`.
+        By default, the limits are the range of the bins.
+        """
+        self.edges = sample_corner_edges(samples, bins, range, chunksize)
+        self.hist1d, self.hist2d = sample_corner(samples, self.edges, weights, chunksize)
+        self.density = density
+        self.hist1d_options, self.hist2d_options = hist1d_options, hist2d_options
+
+        self._artists1d = [self._draw_hist1d(ax, self.edges[i], self._hist1d_values(i), **hist1d_options)
+                           for i, ax in self.enum_diag]
+        self._artists2d = [self._draw_hist2d(ax, self.edges[j], self.edges[i], hist, **hist2d_options)
+                           for hist, ((i, j), ax) in zip(self.hist2d, self.enum_offdiag)]
+
+        if lims is not False:
+            self.set_lims(self.edges[:, (0, -1)] if lims is None else lims)
+
+        return self
+
+    def update(self, samples: np.ndarray, weights: np.ndarray = None, chunksize: int = DEFAULT_CHUNKSIZE):
+        """Add `samples` to the histograms and update the drawn artists in place.
+
+        Only the new samples are histogrammed, with the edges fixed by
+        `draw` (which has to be called first, possibly with no samples and
+        an explicit `range`): samples outside them are ignored.
+        """
+        if self.edges is None:
+            raise RuntimeError('draw() must be called before update().')
+
+        hist1d, hist2d = sample_corner(samples, self.edges, weights, chunksize)
+        self.hist1d += hist1d
+        self.hist2d += hist2d
+
+        for i, ax in self.enum_diag:
+            self._artists1d[i] = self._update_hist1d(ax, self._artists1d[i], self.edges[i], self._hist1d_values(i))
+        for k, (hist, ((i, j), ax)) in enumerate(zip(self.hist2d, self.enum_offdiag)):
+            self._artists2d[k] = self._update_hist2d(ax, self._artists2d[k], self.edges[j], self.edges[i], hist)
 
         return self
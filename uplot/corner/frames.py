@@ -0,0 +1,155 @@
+"""Render frames of Gaussian corners (e.g. one per epoch) in parallel, into PNGs or a video."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import tempfile
+import typing as tp
+from inspect import signature
+from math import ceil, pi
+from pathlib import Path
+
+import numpy as np
+from frozendict import frozendict
+
+from ..utils.lazy import lazy_import
+
+if tp.TYPE_CHECKING:
+    from .Corner import GaussianCorner
+
+mpl = lazy_import('matplotlib')
+plt = lazy_import('matplotlib.pyplot')
+
+
+__all__ = 'frame_lims', 'render_frames'
+
+
+def _corner(ndim: int, corner_kwargs: tp.Mapping) -> GaussianCorner:
+    from .Corner import GaussianCorner
+
+    return GaussianCorner(ndim, **corner_kwargs)
+
+
+_LIMS_KWARGS = 'lims_nsigma', 'lims_pad_fraction', 'lims_collapse_functions'
+
+
+def frame_lims(mean: np.ndarray, cov: np.ndarray, corner: GaussianCorner, **draw_kwargs) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """Limits that fit the Gaussians of all frames, computed like `draw` would for a single frame.
+
+    `mean` and `cov` have a frame (and possibly batch) axes in front, which
+    are all treated as one batch. Returns the ``(ndim, 2)`` limits and the
+    top of the diagonal panels: the highest peak in each, with matplotlib's
+    default margin.
+    """
+    ndim = mean.shape[-1]
+    plan = corner.plan(np.reshape(mean, (-1, ndim)), np.reshape(cov, (-1, ndim, ndim)))
+    defaults = signature(corner.draw).parameters
+    lims = corner._default_lims(plan, *(draw_kwargs.get(key, defaults[key].default) for key in _LIMS_KWARGS))
+    return lims, (1 + mpl.rcParams['axes.ymargin']) / np.sqrt(2 * pi * plan.var.min(-1))
+
+
+# the state of a worker: its corner, drawn at the first frame and updated afterwards
+_worker: tp.Dict[str, tp.Any] = {}
+
+
+def _init_worker(ndim, corner_kwargs, draw_kwargs, lims, tops, savefig_kwargs):
+    _worker.clear()
+    _worker.update(ndim=ndim, corner_kwargs=corner_kwargs, draw_kwargs=draw_kwargs, lims=lims, tops=tops,
+                   savefig_kwargs=savefig_kwargs)
+
+
+def _init_process(*initargs):
+    # workers have no windows
+    plt.switch_backend('agg')
+    _init_worker(*initargs)
+
+
+def _render(paths: tp.Sequence[str], mean: np.ndarray, cov: np.ndarray) -> tp.List[str]:
+    corner = _worker.get('corner')
+    for path, m, c in zip(paths, mean, cov):
+        if corner is None:
+            corner = _worker['corner'] = _corner(_worker['ndim'], _worker['corner_kwargs'])
+            corner.draw(m, c, lims=_worker['lims'], **_worker['draw_kwargs'])
+            for ax, top in zip(corner.iter_diag, _worker['tops']):
+                ax.set_ylim(0, top)
+        else:
+            corner.update(m, c)
+        corner.fig.savefig(path, **_worker['savefig_kwargs'])
+    return list(paths)
+
+
+def render_frames(mean: np.ndarray, cov: np.ndarray, path: tp.Union[str, os.PathLike],
+                  lims: np.ndarray = None, processes: int = None, chunksize: int = None,
+                  fps: float = 25, ffmpeg_args: tp.Sequence[str] = ('-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2'),
+                  corner_kwargs=frozendict(), draw_kwargs=frozendict(), savefig_kwargs=frozendict()) -> tp.Union[Path, tp.List[Path]]:
+    """Render a `GaussianCorner` for each frame of `mean` and `cov` in a pool of processes.
+
+    `mean` and `cov` have shapes ``(nframes, *batch, ndim)`` and
+    ``(nframes, *batch, ndim, ndim)``. Each worker creates a corner with
+    `corner_kwargs` once, draws its first frame with `draw_kwargs` and
+    `update`-s it for the others, in chunks of `chunksize` consecutive
+    frames. The limits are the same for all frames: `lims`, or else those
+    that fit all of them (see `frame_lims`).
+
+    The data are sent to the workers chunk by chunk; memory-mapped
+    `MetaArray`-s are sent as references instead. With ``processes=0``,
+    the frames are rendered in this process. Otherwise, as with any
+    process pool, scripts that call this should be guarded by
+    ``if __name__ == '__main__'`` where processes are spawned.
+
+    If `path` has a suffix (e.g. ``.mp4``), the frames are encoded into
+    that video at `fps` frames per second by ``ffmpeg`` (as configured for
+    matplotlib's animations), with `ffmpeg_args` before the output, and
+    the video path is returned. Otherwise, `path` is a directory for
+    ``frame-NNNNN.png`` files, and their paths are returned.
+    """
+    mean, cov = np.asanyarray(mean), np.asanyarray(cov)
+    nframes, ndim = len(mean), mean.shape[-1]
+    path = Path(path)
+
+    corner = _corner(ndim, corner_kwargs)
+    try:
+        all_lims, tops = frame_lims(mean, cov, corner, **draw_kwargs)
+    finally:
+        plt.close(corner.fig)
+    lims = all_lims if lims is None else np.asarray(lims)
+    draw_kwargs = {key: val for key, val in draw_kwargs.items() if key not in _LIMS_KWARGS}
+    initargs = ndim, corner_kwargs, draw_kwargs, lims, tops, savefig_kwargs
+    pattern = f'frame-%0{max(5, len(str(nframes - 1)))}d.png'
+
+    if not path.suffix:
+        path.mkdir(parents=True, exist_ok=True)
+        return _render_pngs(mean, cov, [path / (pattern % k) for k in range(nframes)], initargs, processes, chunksize)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _render_pngs(mean, cov, [Path(tmp, pattern % k) for k in range(nframes)], initargs, processes, chunksize)
+        subprocess.run([mpl.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+                        '-framerate', str(fps), '-i', os.path.join(tmp, pattern),
+                        *ffmpeg_args, os.fspath(path)], check=True)
+    return path
+
+
+def _render_pngs(mean, cov, paths: tp.List[Path], initargs, processes: int = None, chunksize: int = None) -> tp.List[Path]:
+    if processes == 0:
+        state = dict(_worker)
+        try:
+            _init_worker(*initargs)
+            _render(list(map(str, paths)), mean, cov)
+        finally:
+            if 'corner' in _worker:
+                plt.close(_worker['corner'].fig)
+            _worker.clear()
+            _worker.update(state)
+        return paths
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = processes or os.cpu_count()
+    chunksize = chunksize or max(1, ceil(len(paths) / (4 * processes)))
+    with ProcessPoolExecutor(processes, initializer=_init_process, initargs=initargs) as pool:
+        for future in [pool.submit(_render, list(map(str, paths[start:start + chunksize])),
+                                   mean[start:start + chunksize], cov[start:start + chunksize])
+                       for start in range(0, len(paths), chunksize)]:
+            future.result()
+    return paths
@@ -1,60 +1,136 @@
-import os
-import pickle
 import typing as tp
 from functools import partial
 from math import pi
-from operator import itemgetter
 
 import numpy as np
-import sympy as sym
 
-from ..utils import _move_batch_mat, _rowwise_combinations, vfloat
+from ..utils import vfloat
+
+
+_EllipseArrays = tp.Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _ellipse_from_elements(c00: np.ndarray, c11: np.ndarray, c10: np.ndarray, out: _EllipseArrays) -> _EllipseArrays:
+    # fills out = (width, height, angle), overwriting c00 and c11
+    width, height, angle = out
+    total = c00 + c11
+    diff = np.subtract(c00, c11, out=c00)
+    D = np.hypot(diff, 2 * c10, out=c11)
+
+    np.add(total, D, out=width)
+    np.subtract(total, D, out=height)
+    for a in (width, height):
+        a /= 2
+        np.sqrt(a, out=a)
+
+    angle[...] = 0
+    np.divide(2 * c10, D, out=angle, where=D != 0)
+    np.clip(angle, -1, 1, out=angle)
+    np.arcsin(angle, out=angle)
+    angle /= 2
+    np.subtract(pi / 2, angle, out=angle, where=diff < 0)
+    return out
 
 
 def covariance_ellipse(c00, c11, c10):
-    D = np.sqrt((c00-c11)**2 + 4*c10**2)
-    scale = np.sqrt(((c00+c11) + np.moveaxis(np.array((1, -1)) * D[..., None], -1, 0)) / 2)
-    angle = np.where(D, 0.5 * np.arcsin(2 * c10 / D), 0.)
+    c00, c11, c10 = (np.array(c, dtype=float) for c in np.broadcast_arrays(c00, c11, c10))
     return tp.cast(tp.Tuple[vfloat, vfloat, vfloat],
-                   (*scale, np.where(c00-c11 >= 0, angle, pi / 2 - angle)))
+                   _ellipse_from_elements(c00, c11, c10, tuple(np.empty_like(c10) for _ in range(3))))
+
+
+ELLIPSE_FIELDS = 'width', 'height', 'angle'
+
+
+def covariance_ellipses(cov: np.ndarray, ix: tp.Sequence[int] = None, iy: tp.Sequence[int] = None,
+                        batch_at_front=True, dtype: np.dtype = None,
+                        out: tp.Union[_EllipseArrays, np.ndarray] = None, structured=False,
+                        xscale: vfloat = None, yscale: vfloat = None) -> tp.Union[_EllipseArrays, np.ndarray]:
+    """Ellipse widths, heights and angles for many pairs of dimensions in a stack of covariances.
+
+    `cov` has shape ``(*batch, ndim, ndim)``, or ``(ndim, ndim, *batch)`` if
+    not `batch_at_front`, and the outputs have shape ``(*batch, npairs)``,
+    or ``(npairs, *batch)``, respectively. The pairs are given by `ix` and
+    `iy`, by default all lower-triangle pairs as drawn in a corner plot,
+    i.e. ``iy, ix = np.tril_indices(ndim, -1)``.
+
+    The computation is done in `dtype` (by default, float64 unless `cov`
+    is float32) and can write into preallocated `out`: a tuple of three
+    arrays or, like the result if `structured`, an array with fields
+    `ELLIPSE_FIELDS`.
+
+    The ellipses can be computed after scaling the x and y coordinates by
+    `xscale` and `yscale`, which broadcast against the outputs.
+    """
+    cov = np.asarray(cov)
+    if ix is None:
+        iy, ix = np.tril_indices(cov.shape[-1] if batch_at_front else cov.shape[0], -1)
+    if dtype is None:
+        dtype = np.result_type(cov.dtype, np.float32)
+
+    c00, c11, c10 = (
+        (cov[..., a, b] if batch_at_front else cov[a, b]).astype(dtype, copy=False)
+        for a, b in ((ix, ix), (iy, iy), (iy, ix)))
+    if xscale is not None or yscale is not None:
+        xscale, yscale = (1 if scale is None else np.asarray(scale, dtype=dtype) for scale in (xscale, yscale))
+        c00, c11, c10 = c00 * xscale**2, c11 * yscale**2, c10 * (xscale * yscale)
+
+    if out is None:
+        out = (np.empty(c00.shape, dtype=[(name, dtype) for name in ELLIPSE_FIELDS]) if structured
+               else tuple(np.empty(c00.shape, dtype=dtype) for _ in ELLIPSE_FIELDS))
+    _ellipse_from_elements(c00, c11, c10, tuple(map(out.__getitem__, ELLIPSE_FIELDS)) if isinstance(out, np.ndarray) else out)
+    return out
 
 
 def gaussian_corner(cov: np.ndarray, batch_at_front=True) -> tp.Tuple[tp.Tuple[int, int], tp.Tuple[tp.Tuple[np.ndarray, np.ndarray], np.ndarray]]:
-    if batch_at_front:
-        cov = _move_batch_mat(cov)
-    for i, j in _rowwise_combinations(len(cov)):
-        yield (i, j), covariance_ellipse(cov[i, i], cov[j, j], cov[i, j])
+    il, jl = np.tril_indices(np.shape(cov)[-1 if batch_at_front else 0], -1)
+    width, height, angle = covariance_ellipses(cov, ix=il, iy=jl, batch_at_front=batch_at_front)
+    for k, (i, j) in enumerate(zip(il.tolist(), jl.tolist())):
+        yield (i, j), ((width[..., k], height[..., k], angle[..., k]) if batch_at_front
+                       else (width[k], height[k], angle[k]))
 
 
-_trellipse_callable = tp.Callable[[vfloat, vfloat, vfloat, vfloat], vfloat]
-TRELLIPSE_FNAME = os.path.join(os.path.dirname(__file__), 'trellipse.pickle')
+def trellipse(w: vfloat, h: vfloat, angle: vfloat, t: vfloat, out: _EllipseArrays = None) -> _EllipseArrays:
+    """Radii and rotation of an ellipse after scaling its y axis by `t`.
 
+    The ellipse has semi-axes `w` and `h` and is rotated by `angle` (in
+    radians). The results ``(ow, oh, oa)`` are such that scaling the radii
+    ``(ow, t * oh)`` *before* rotating by `oa`, like TikZ does in an axis
+    whose y unit is `t` times its x unit, gives the scaled ellipse.
+    """
+    w, h, angle, t = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (w, h, angle, t)))
+    cos, sin = np.cos(angle), np.sin(angle)
+    w2, h2 = w**2, h**2
+    out = _ellipse_from_elements(w2 * cos**2 + h2 * sin**2, t**2 * (w2 * sin**2 + h2 * cos**2), t * (w2 - h2) * sin * cos,
+                                 tuple(np.empty_like(w) for _ in range(3)) if out is None else out)
+    np.divide(out[1], t, out=out[1])
+    return out
 
-def get_trellipse(fname: str = TRELLIPSE_FNAME):
-    data = pickle.load(open(fname, 'rb'))
-    return tp.cast(tp.Tuple[_trellipse_callable, _trellipse_callable, _trellipse_callable],
-                   tuple(map(partial(sym.lambdify, data['args']), itemgetter('ow', 'oh', 'oa')(data))))
 
+_trellipse_callable = tp.Callable[[vfloat, vfloat, vfloat, vfloat], vfloat]
+
+
+def get_trellipse() -> tp.Tuple[_trellipse_callable, _trellipse_callable, _trellipse_callable]:
+    """`trellipse` as three functions of ``(w, h, angle, t)``."""
+    return tuple(partial(lambda k, *args: trellipse(*args)[k], k) for k in range(3))
 
 
 if __name__ == '__main__' and True:
+    # derive trellipse symbolically and check the numpy version against it
+    import sympy as sym
+
     w, h, t = sym.symbols('w, h, t', positive=True)
     theta = sym.Symbol('theta')
-    TR = sym.Matrix(((1, 0), (0, t))) @ sym.rot_axis3(theta)[:2, :2]
-    U, L = (TR @ sym.Matrix(((w**2, 0), (0, h**2))) @ TR.T).diagonalize(normalize=True)
-
-    # use covariance matrix as input
-    # ------------------------------
-    a, b = sym.symbols('a, b', positive=True)
-    c = sym.Symbol('c')
-    T = sym.Matrix(((1, 0), (0, t)))
-    U, L = (T @ sym.Matrix(((a, c), (c, b))) @ T.T).diagonalize(normalize=True)
-
-    # args = (w, h, theta, t)
-    ow, oh = sym.sqrt(L[0, 0]), sym.sqrt(L[1, 1]) / t
-    oa = sym.atan2(sym.sign(theta) * U[1, 1], U[1, 0])
-    #
-    # pickle.dump({'args': args, 'ow': ow, 'oh': oh, 'oa': oa},
-    #             open(TRELLIPSE_FNAME, 'wb'))
-    #
-    # TikzGaussianCorner._ow, TikzGaussianCorner._oh, TikzGaussianCorner._oa = get_trellipse()
+    rot = lambda a: sym.rot_axis3(-a)[:2, :2]
+    TR = sym.Matrix(((1, 0), (0, t))) @ rot(theta)
+    M = TR @ sym.Matrix(((w**2, 0), (0, h**2))) @ TR.T
+    D = sym.sqrt(M.trace()**2 - 4 * M.det())
+    ow, oh = sym.sqrt((M.trace() + D) / 2), sym.sqrt((M.trace() - D) / 2) / t
+
+    args = np.random.default_rng(0).uniform((0.1, 0.1, -pi, 0.1), (10, 10, pi, 10), (100, 4)).T
+    _ow, _oh, _oa = trellipse(*args)
+    assert np.allclose(sym.lambdify((w, h, theta, t), ow)(*args), _ow)
+    assert np.allclose(sym.lambdify((w, h, theta, t), oh)(*args), _oh)
+
+    oa = sym.Symbol('oa')
+    residual = sym.lambdify((w, h, theta, t, oa), rot(oa) @ sym.diag(ow**2, (t * oh)**2) @ rot(oa).T - M)
+    assert all(np.allclose(residual(*a, _a), 0) for *a, _a in zip(*args, _oa))
@@ -0,0 +1,81 @@
+import typing as tp
+
+import numpy as np
+
+
+DEFAULT_CHUNKSIZE = 2**16
+
+
+def _chunks(arr, chunksize: int):
+    for start in range(0, len(arr), chunksize):
+        yield arr[start:start+chunksize]
+
+
+def sample_ranges(samples: np.ndarray, chunksize: int = DEFAULT_CHUNKSIZE) -> np.ndarray:
+    """Per-dimension ``(min, max)`` of (nsamples, ndim) `samples`, ignoring nans, computed chunk by chunk."""
+    return np.stack([
+        f.reduce([f.reduce(np.asarray(chunk, dtype=float), axis=0) for chunk in _chunks(samples, chunksize)], axis=0)
+        for f in (np.fmin, np.fmax)
+    ], -1)
+
+
+def sample_corner_edges(samples: np.ndarray, bins: tp.Union[int, np.ndarray] = 20, range: np.ndarray = None,
+                        chunksize: int = DEFAULT_CHUNKSIZE) -> np.ndarray:
+    """Bin edges, shape (ndim, nbins+1), shared by the 1D and 2D histograms of `samples`.
+
+    `bins` can be a number of bins or explicit edges, either shared by all
+    dimensions or given per dimension. `range`, shape (ndim, 2), defaults to
+    the extent of the samples.
+    """
+    ndim = np.shape(samples)[-1]
+    if np.ndim(bins):
+        bins = np.asarray(bins, dtype=float)
+        return np.broadcast_to(bins, (ndim, bins.shape[-1]))
+    if range is None:
+        range = sample_ranges(samples, chunksize)
+    range = np.broadcast_to(np.asarray(range, dtype=float), (ndim, 2))
+    return np.linspace(range[:, 0], range[:, 1], bins + 1, axis=-1)
+
+
+def sample_corner(samples: np.ndarray, edges: np.ndarray, weights: np.ndarray = None,
+                  chunksize: int = DEFAULT_CHUNKSIZE) -> tp.Tuple[np.ndarray, np.ndarray]:
+    """All 1D and lower-triangle 2D histograms of (nsamples, ndim) `samples`.
+
+    Returns ``hist1d`` with shape (ndim, nbins) and ``hist2d`` with shape
+    (npairs, nbins, nbins), with pairs ``(i, j)`` ordered as in
+    ``np.tril_indices(ndim, -1)`` and ``hist2d[k]`` indexed by the bins of
+    dimensions ``i`` (rows) and ``j`` (columns). Samples are processed
+    `chunksize` at a time (so that e.g. memory-mapped arrays are never fully
+    loaded), each chunk with a single `np.bincount` per histogram kind over
+    flattened bin indices. Samples outside the edges or nan are ignored.
+    """
+    edges = np.asarray(edges, dtype=float)
+    ndim, nbins = edges.shape[0], edges.shape[-1] - 1
+    il, jl = np.tril_indices(ndim, -1)
+    npairs = len(il)
+
+    hist1d = np.zeros(ndim * nbins + 1)
+    hist2d = np.zeros(npairs * nbins**2 + 1)
+    offsets1d = np.arange(ndim) * nbins
+    offsets2d = np.arange(npairs) * nbins**2
+
+    wchunks = _chunks(weights, chunksize) if weights is not None else None
+    for chunk in _chunks(samples, chunksize):
+        chunk = np.asarray(chunk, dtype=float)
+        w = np.asarray(next(wchunks), dtype=float) if wchunks is not None else None
+
+        idx = np.empty(chunk.shape, dtype=int)
+        for d in range(ndim):
+            idx[:, d] = np.searchsorted(edges[d], chunk[:, d], side='right') - 1
+        idx[chunk == edges[:, -1]] = nbins - 1
+        valid = (idx >= 0) & (idx < nbins)
+
+        # invalid entries are sent to an extra bin at the end, which is discarded
+        hist1d += np.bincount(
+            np.where(valid, offsets1d + idx, len(hist1d) - 1).reshape(-1),
+            weights=None if w is None else np.repeat(w, ndim), minlength=len(hist1d))
+        hist2d += np.bincount(
+            np.where(valid[:, il] & valid[:, jl], offsets2d + idx[:, il] * nbins + idx[:, jl], len(hist2d) - 1).reshape(-1),
+            weights=None if w is None else np.repeat(w, npairs), minlength=len(hist2d))
+
+    return hist1d[:-1].reshape(ndim, nbins), hist2d[:-1].reshape(npairs, nbins, nbins)
@@ -1,3 +1,5 @@
 from .axes import *
 from .commands import *
 from .corner import *
+from .styles import *
+from .table import *
@@ -1,8 +1,54 @@
+from __future__ import annotations
+
+import os
 import typing as tp
 from abc import ABC
-from functools import partial
-from itertools import chain
-from operator import is_not
+from bisect import bisect_right
+from collections.abc import MutableSequence
+from itertools import islice
+
+from ..utils.profiling import instrumented
+
+
+_T = tp.TypeVar('_T')
+
+
+class Memoized:
+    """Mixin for nodes that cache small pieces of their own rendering (e.g. their options) until they change.
+
+    Whole bodies are not cached, so that large outputs are streamed and
+    not kept in memory.
+
+    Assigning an attribute of the node, or mutating `Optionable.options`,
+    invalidates its cache. Changes to anything else, e.g. class attributes
+    or plain mutable attributes, are not noticed; call `invalidate` after
+    them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.__dict__['_cache'] = {}
+        super().__init__(*args, **kwargs)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if '_cache' in self.__dict__:
+            self.invalidate()
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def __getstate__(self):
+        return {key: val for key, val in self.__dict__.items() if key != '_cache'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _cache={})
+
+    def _memoize(self, key, render: tp.Callable[[], _T]) -> _T:
+        try:
+            return self._cache[key]
+        except KeyError:
+            result = self._cache[key] = render()
+            return result
 
 
 class Orderable:
@@ -11,14 +57,68 @@ class Orderable:
         self.zorder = zorder
 
 
+class ZOrderedList(MutableSequence, tp.Generic[_T]):
+    """A list that keeps its items (stably) sorted by zorder as they are added.
+
+    Positions passed to `insert` are ignored: items are placed after all
+    items with lower or equal zorder, which is the order `sorted` would give.
+    Changing the zorder of an item already in the list does not reorder it.
+    """
+
+    def __init__(self, iterable: tp.Iterable[_T] = ()):
+        self._items: tp.List[_T] = []
+        self._keys: tp.List[float] = []
+        self.extend(iterable)
+
+    @staticmethod
+    def _key(item):
+        return item.zorder if isinstance(item, Orderable) else 0
+
+    def insert(self, index, value: _T):
+        key = self._key(value)
+        if self._keys and key < self._keys[-1]:
+            index = bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._items.insert(index, value)
+        else:
+            self._keys.append(key)
+            self._items.append(value)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = list(value)
+            del self[index]
+            self.extend(values)
+        else:
+            del self[index]
+            self.insert(index, value)
+
+    def __delitem__(self, index):
+        del self._items[index]
+        del self._keys[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._items!r})'
+
+
 class Printable(Orderable):
     _header: str = None
     _footer: str = None
     _joiner: str = '\n'
+    _indent: str = '\t'
 
     def __init__(self, *args, zorder=0, children=None, _header=None, _footer=None, _joiner=None, **kwargs):
         super().__init__(*args, zorder=zorder, **kwargs)
-        self.children: tp.MutableSequence[tp.Union[Printable, Command, str]] = [] if children is None else children
+        self.children = () if children is None else children
         if _header is not None:
             self._header = _header
         if _footer is not None:
@@ -26,37 +126,90 @@ class Printable(Orderable):
         if _joiner is not None:
             self._joiner = _joiner
 
+    @property
+    def children(self) -> ZOrderedList[tp.Union[Printable, Command, str]]:
+        return self._children
+
+    @children.setter
+    def children(self, value: tp.Iterable[tp.Union[Printable, Command, str]]):
+        self._children = value if isinstance(value, ZOrderedList) else ZOrderedList(value)
+
     @property
     def header(self) -> tp.Optional[str]:
         return self._header
 
+    def print_body(self, indent='', joiner='\n') -> tp.Iterable[str]:
+        newline = joiner + indent
+        for ch in self.children:
+            if isinstance(ch, Printable):
+                yield from ch.print(indent, joiner)
+            else:
+                yield indent + str(ch).replace('\n', newline)
+
     @property
     def body(self):
-        return ('\t' + c
-                for ch in sorted(self.children, key=self._sort_key)
-                for c in (ch.print() if isinstance(ch, Printable)
-                          else str(ch).split('\n')))
+        return self.print_body(self._indent)
 
     @property
     def footer(self) -> tp.Optional[str]:
         return self._footer
 
-    @staticmethod
-    def _sort_key(printable_or_string):
-        return printable_or_string.zorder if isinstance(printable_or_string, Orderable) else 0
+    def print(self, indent='', joiner='\n') -> tp.Iterable[str]:
+        """Iterate the chunks of output, to be separated by `joiner`.
+
+        Every line of output is prefixed with `indent`, and nested children
+        are indented further. Multi-line strings are kept in a single chunk,
+        with their line breaks replaced by `joiner`.
+        """
+        if (header := self.header) is not None:
+            yield indent + header
+        yield from self.print_body(indent + self._indent, joiner)
+        if (footer := self.footer) is not None:
+            yield indent + footer
+
+    @instrumented
+    def write_to(self, fp: tp.Union[str, os.PathLike, tp.TextIO]):
+        """Stream the output into a file (path) or a writable text buffer."""
+        if isinstance(fp, (str, os.PathLike)):
+            with open(fp, 'w') as f:
+                return self.write_to(f)
+
+        chunks = iter(self.print(joiner=self._joiner))
+        for chunk in islice(chunks, 1):
+            fp.write(chunk)
+        for chunk in chunks:
+            fp.write(self._joiner)
+            fp.write(chunk)
+        return fp
+
+    @instrumented
+    def __str__(self):
+        return self._joiner.join(self.print(joiner=self._joiner))
 
-    def print(self) -> tp.Iterable[str]:
-        return filter(partial(is_not, None), chain(
-            (self.header,),
-            self.body,
-            (self.footer,)
-        ))
 
-    def __str__(self):
-        return self._joiner.join(self.print())
+class _OptionsDict(dict):
+    # a dict that invalidates its owner when changed
+    def __init__(self, owner: Memoized, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._owner = owner
+
+    def __reduce__(self):
+        return type(self), (self._owner, dict(self))
+
+
+def _invalidating(method):
+    def mutator(self: _OptionsDict, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._owner.invalidate()
+        return result
+    return mutator
 
 
-class Optionable:
+for _name in ('__setitem__', '__delitem__', '__ior__', 'pop', 'popitem', 'clear', 'update', 'setdefault'):
+    setattr(_OptionsDict, _name, _invalidating(getattr(dict, _name)))
+
+
+class Optionable(Memoized):
     no_output = object()
     defaults = {}
 
@@ -65,12 +218,21 @@ class Optionable:
     def __init__(self, *args, options: _OptionsType = None, additional_options='', **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.options: Optionable._OptionsType = (
+        self.options = (
             options if isinstance(options, tp.Mapping)
             else {key: None for key in options} if options else {}
         )
         self.additional_options = additional_options
 
+    @property
+    def options(self) -> tp.MutableMapping[str, tp.Union[str, tp.Any]]:
+        return self._options
+
+    @options.setter
+    def options(self, value: tp.Mapping[str, tp.Union[str, tp.Any]]):
+        # copied, so that changes made through it can be tracked
+        self._options = _OptionsDict(self, value)
+
     def _set_options(self, delete_if_None=True, **kwargs):
         for key, val in kwargs.items():
             if val is None:
@@ -95,7 +257,7 @@ class Optionable:
 
     @property
     def formatted_options(self):
-        return self.format_options(self.additional_options, **self.options)
+        return self._memoize('formatted_options', lambda: self.format_options(self.additional_options, **self.options))
 
     def __str__(self):
         return self.formatted_options
@@ -1,14 +1,16 @@
+import os
 import typing as tp
 
 import numpy as np
 from frozendict import frozendict
 
 from .bases import Command, Optionable
-from .utils import points_to_coords
+from .table import PGFTable
+from .utils import _chains, points3d_to_metacoords, points_to_coords
 
 
 __all__ = 'DrawCommand', 'AxhlineCommand', 'AxvlineCommand', 'EllipseCommand',\
-          'AddplotCommand', 'AddplotExpression', 'AddplotCoordinates'
+          'AddplotCommand', 'AddplotExpression', 'AddplotCoordinates', 'AddplotMetaCoordinates', 'AddplotGraphics'
 
 
 
@@ -83,10 +85,67 @@ class AddplotExpression(AddplotCommand):
 class AddplotCoordinates(AddplotCommand):
     num_fmt = '.4e'
     subcommand = 'coordinates'
+    table_keys = 'x', 'y', 'z'
 
-    def __init__(self, points: tp.Union[tp.Iterable[tp.Iterable[tp.Tuple[float, float]]], np.ndarray], coordsys=None, *args, **kwargs):
-        super().__init__(command_body=points_to_coords(points, self.num_fmt, coordsys), *args, **kwargs)
+    _format_points = staticmethod(points_to_coords)
+
+    def __init__(self, points: tp.Union[tp.Iterable[tp.Iterable[tp.Tuple[float, float]]], np.ndarray], coordsys=None, *args,
+                 table: tp.Union[str, os.PathLike, PGFTable] = None,
+                 num_fmt: tp.Union[str, tp.Sequence[str]] = None, offset: tp.Sequence[float] = None, **kwargs):
+        """
+        `num_fmt` overrides the format of the numbers, and can give one for
+        each coordinate. With an `offset` (for each coordinate, or ``0``),
+        the points are written relative to it, and pgfplots adds it back
+        with ``x filter`` and ``y filter`` (``z filter``), which keeps
+        coordinates far from zero short.
+        """
+        if offset is not None and any(offset):
+            # only coordinates can be filtered, not e.g. point meta
+            offset = np.where([key in 'xyz' for key in self.table_keys[:len(offset)]], offset, 0.)
+            points = [np.asarray(ch, dtype=float) - offset for ch in _chains(points)]
+            kwargs['options'] = {**{
+                f'{key} filter/.expression': f'{key}{off:+.15g}'
+                for key, off in zip(self.table_keys, offset) if off
+            }, **_options_dict(kwargs.get('options'))}
+
+        # tables cannot specify a coordinate system, so fall back to inline coordinates
+        if table is None or coordsys is not None:
+            super().__init__(command_body=self._format_points(points, self.num_fmt if num_fmt is None else num_fmt, coordsys), *args, **kwargs)
+            return
+
+        own_table = not isinstance(table, PGFTable)
+        if own_table:
+            table = PGFTable(table, num_fmt=self.num_fmt)
+        columns, jumps = table.add(points, num_fmt)
+        if own_table:
+            table.write()
+
+        if jumps:
+            kwargs['options'] = {'unbounded coords': 'jump', **_options_dict(kwargs.get('options'))}
+        columns = dict(zip(self.table_keys, columns.values()))
+        super().__init__(table.tex_path, 'table', {**columns, **kwargs.pop('subcommand_options', {})}, *args, **kwargs)
+        self.table = table
+
+
+def _options_dict(options) -> tp.Mapping:
+    return options if isinstance(options, tp.Mapping) else {key: None for key in options or ()}
+
+
+class AddplotMetaCoordinates(AddplotCoordinates):
+    """Coordinates with explicit point meta, given as the third column of `points`."""
+
+    table_keys = 'x', 'y', 'meta'
+
+    _format_points = staticmethod(points3d_to_metacoords)
 
 
 class AddplotGraphics(AddplotCommand):
+    """An image file stretched over ``xmin``-``xmax`` and ``ymin``-``ymax`` in axis coordinates."""
+
     subcommand = 'graphics'
+
+    def __init__(self, path: str, xmin: float, xmax: float, ymin: float, ymax: float, *args,
+                 subcommand_options=frozendict(), **kwargs):
+        super().__init__(path, self.subcommand, {
+            'xmin': xmin, 'xmax': xmax, 'ymin': ymin, 'ymax': ymax, **subcommand_options
+        }, *args, **kwargs)
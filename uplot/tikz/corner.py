@@ -1,13 +1,18 @@
+from dataclasses import replace
+
 import numpy as np
 from frozendict import frozendict
 
 from .axes import PGFAxisInGroup, PGFGroupplot
 from .bases import Optionable
-from .commands import AddplotExpression, AxhlineCommand, AxvlineCommand, EllipseCommand
-from ..corner.abstractcorner import AbstractCorner, AbstractGaussianCorner
+from .commands import AddplotCommand, AddplotCoordinates, AddplotExpression, AddplotMetaCoordinates, AxhlineCommand, AxvlineCommand, DrawCommand, EllipseCommand
+from ..corner.abstractcorner import AbstractCorner, AbstractGaussianCorner, AbstractSampleCorner, GaussianDrawPlan
+from ..corner.gaussian_corner import covariance_ellipses, trellipse
+from .utils import _decimals
+from ..utils.profiling import instrumented
 
 
-__all__ = 'PGFCorner', 'PGFGaussianCorner'
+__all__ = 'PGFCorner', 'PGFGaussianCorner', 'PGFSampleCorner'
 
 
 class PGFCorner(AbstractCorner[PGFAxisInGroup], PGFGroupplot):
@@ -26,6 +31,7 @@ class PGFCorner(AbstractCorner[PGFAxisInGroup], PGFGroupplot):
         ax.children.extend((AxvlineCommand(truth_x, options={**self.truth_options, **kwargs}, zorder=100),
                             AxhlineCommand(truth_y, options={**self.truth_options, **kwargs}, zorder=100)))
 
+    @instrumented
     def __init__(self, ndim=None, names=None, truths=None, labels=None,
                  truth_options=frozendict(), axs=None,
                  diagplot_args='', offdiag_args='',
@@ -55,21 +61,140 @@ class PGFCorner(AbstractCorner[PGFAxisInGroup], PGFGroupplot):
 class PGFGaussianCorner(AbstractGaussianCorner[PGFAxisInGroup], PGFCorner):
     num_fmt = '{:.4e}'
 
+    def __init__(self, *args, ellipse_radii=False, axis_ratio=1., precision: float = None, **kwargs):
+        """
+        With `ellipse_radii`, the contours are drawn as plain TikZ ellipses
+        with radii and rotation from `trellipse`, instead of with
+        ``\\plotellipseabc``. This needs the axis limits (see `draw`), and
+        `axis_ratio` is the height of the panels over their width.
+
+        With a `precision` (a fraction of the axis ranges, e.g. ``1e-3`` for
+        about 0.2pt in 200pt-wide panels), the means on linear axes are
+        rounded to it within the limits and written in their shortest form,
+        and other numbers get just enough significant digits.
+        """
+        self.ellipse_radii, self.axis_ratio, self.precision = ellipse_radii, axis_ratio, precision
+        super().__init__(*args, **kwargs)
+
     def _num_fmt(self, num):
+        if self.precision is not None:
+            return format(num, f'.{_decimals(self.precision)}e')
         return self.num_fmt.format(num)
 
+    def _pos_fmt(self, num):
+        # means rounded by _quantized are already formatted
+        return num if isinstance(num, str) else self._num_fmt(num)
+
+    def _quantized(self, plan: GaussianDrawPlan) -> GaussianDrawPlan:
+        if self.precision is None or self.lims is None:
+            return plan
+        mean = plan.mean.astype(object)
+        for i, lims in enumerate(self.lims):
+            step = self.precision * np.ptp(lims)
+            if self._dimension_transform(i) is None and 0 < step < np.inf:
+                # in their shortest form, which rounding made short
+                mean[i] = list(map(repr, np.round(plan.mean[i], _decimals(step)).tolist()))
+        return replace(plan, mean=mean, centres=mean[self.idxl[::-1]].reshape(plan.centres.shape))
+
+    @instrumented
+    def draw_hist(self, plan: GaussianDrawPlan):
+        return super().draw_hist(self._quantized(plan))
+
     def _draw_hist(self, m, v, _options=frozendict(), **options):
-        return AddplotExpression(f'exp(-(x-{self._num_fmt(m)})^2 / 2 / {self._num_fmt(v)}) / {self._num_fmt(v**0.5)}',
+        return AddplotExpression(f'exp(-(x-{self._pos_fmt(m)})^2 / 2 / {self._num_fmt(v)}) / {self._num_fmt(v**0.5)}',
                                  options={**options, **_options})
 
     def _draw_contour(self, x, y, a=1., b=1., c=0.,
                       levels=(1,), level_kwargs: EllipseCommand._LevelKwargsType = (frozendict(),),
                       _options=frozendict(), zorder=0, **options: Optionable._OptionsType):
-        return EllipseCommand(*map(self._num_fmt, (x, y, a, b, c)),
+        if self.ellipse_radii:
+            # here, a, b and c are the radii and rotation
+            return [DrawCommand(f'(axis cs:{self._pos_fmt(x)}, {self._pos_fmt(y)}) ellipse [x radius={self._num_fmt(level * a)}, '
+                                f'y radius={self._num_fmt(level * b)}, rotate={self._num_fmt(np.rad2deg(c))}]',
+                                options={**options, **_options, **({} if isinstance(lkw, str) else lkw)},
+                                additional_options=lkw if isinstance(lkw, str) else '', zorder=zorder)
+                    for level, lkw in zip(levels, level_kwargs)]
+        return EllipseCommand(self._pos_fmt(x), self._pos_fmt(y), *map(self._num_fmt, (a, b, c)),
                               levels=levels, level_kwargs=level_kwargs, options={**options, **_options}, zorder=zorder)
 
-    _get_ellipse_args = AbstractGaussianCorner._get_cov_elements
+    @instrumented
+    def draw_contour(self, plan: GaussianDrawPlan):
+        plan = self._quantized(plan)
+        if not self.ellipse_radii:
+            return super().draw_contour(plan)
+        if self.lims is None:
+            raise ValueError('Drawing ellipses by their radii needs the axis limits.')
+
+        # TikZ scales the radii before rotating, so correct for the ratio of the axis units
+        ranges = np.array([np.ptp(lims if f is None else f(lims)) for f, lims in zip(
+            map(self._dimension_transform, range(self.ndim)), self.lims)])
+        t = self.axis_ratio * ranges[self.jl] / ranges[self.il]
+        plan = replace(plan, ellipses=trellipse(*plan.ellipses, t[:, None]))
+        return [[command for commands in panel for command in commands] for panel in super().draw_contour(plan)]
 
+    @staticmethod
+    def _update_commands(drawn, new):
+        # commands are plain text, so take the new text, keeping the commands (and their place in the tree)
+        for old_commands, new_commands in zip(drawn, new):
+            for old, command in zip(old_commands, new_commands):
+                old.command_body = command.command_body
+                if isinstance(command, AddplotCommand):
+                    old.sub = command.sub
+        return drawn
+
+    def update_hist(self, drawn, plan: GaussianDrawPlan):
+        return self._update_commands(drawn, self.draw_hist(plan))
+
+    def update_contour(self, drawn, plan: GaussianDrawPlan):
+        return self._update_commands(drawn, self.draw_contour(plan))
+
+    def _get_ellipse_args(self, cov):
+        return (covariance_ellipses(cov, self.jl, self.il, batch_at_front=False) if self.ellipse_radii
+                else self._get_cov_elements(cov))
+
+    def _dimension_transform(self, i):
+        # pgfplots works with the natural logarithm on log axes
+        return np.log if self.axs[-1, i].options.get('xmode') == 'log' else None
+
+    @instrumented
     def _draw(self, _drawing):
         for ax, commands in _drawing:
             ax.children.extend(commands)
+
+
+class PGFSampleCorner(AbstractSampleCorner[PGFAxisInGroup], PGFCorner):
+    @staticmethod
+    def _hist1d_command(edges, hist, **options):
+        return AddplotCoordinates(
+            np.stack((edges, np.append(hist, hist[-1])), -1),
+            options={'const plot': None, **options})
+
+    @staticmethod
+    def _hist2d_command(xedges, yedges, hist, **options):
+        centres = np.meshgrid((xedges[1:] + xedges[:-1]) / 2, (yedges[1:] + yedges[:-1]) / 2)
+        return AddplotMetaCoordinates(
+            np.stack((*centres, hist), -1),
+            options={'matrix plot*': None, 'mesh/cols': len(xedges) - 1, 'point meta': 'explicit', **options})
+
+    @classmethod
+    def _draw_hist1d(cls, ax, edges, hist, **options):
+        command = cls._hist1d_command(edges, hist, **options)
+        ax.children.append(command)
+        return command
+
+    @classmethod
+    def _draw_hist2d(cls, ax, xedges, yedges, hist, **options):
+        command = cls._hist2d_command(xedges, yedges, hist, **options)
+        ax.children.append(command)
+        return command
+
+    # commands are plain text, so take the new text, keeping the commands (and their place in the tree)
+    @classmethod
+    def _update_hist1d(cls, ax, artist, edges, hist):
+        artist.sub = cls._hist1d_command(edges, hist).sub
+        return artist
+
+    @classmethod
+    def _update_hist2d(cls, ax, artist, xedges, yedges, hist):
+        artist.sub = cls._hist2d_command(xedges, yedges, hist).sub
+        return artist
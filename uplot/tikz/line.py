@@ -1,13 +1,23 @@
+import os
 import typing as tp
+from math import ceil
+from pathlib import PurePath
 
 import numpy as np
 from frozendict import frozendict
+from matplotlib import rcParams
+from matplotlib.artist import Artist
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.collections import PathCollection, QuadMesh
+from matplotlib.image import AxesImage, imsave
 from matplotlib.lines import Line2D
 
 from uplot.tikz.axes import PGFAbstractAxis, PGFAxis
-from uplot.tikz.commands import AddplotCoordinates
-from uplot.tikz.utils import mpl_color_to_tikz, mpl_linestyle_to_tikz
+from uplot.tikz.commands import AddplotCoordinates, AddplotGraphics
+from uplot.tikz.table import PGFTable
+from uplot.tikz.utils import adaptive_num_fmt, mpl_color_to_tikz, mpl_linestyle_to_tikz, shift_offset
+from uplot.utils.decimate import decimate
 
 
 class TikzLine2D(AddplotCoordinates):
@@ -18,10 +28,34 @@ class TikzLine2D(AddplotCoordinates):
     # TODO: drawstyles: 'default', 'steps', 'steps-pre', 'steps-mid', 'steps-post'
     # TODO: label
     # TODO: marker
-    def __init__(self, line2d: Line2D, *args, **kwargs):
+    def __init__(self, line2d: Line2D, *args,
+                 decimation: str = None, decimation_dpi: float = None, decimation_width: float = None,
+                 precision: float = None, shift=False,
+                 **kwargs):
+        """
+        With a `precision` (in TeX points), the numbers are written with as
+        many decimals as needed to place the points that precisely within
+        the current limits, when the axes have the size they have in the
+        figure or are `decimation_width` inches wide. With `shift`, points
+        far from zero are written relative to a round offset (see
+        `AddplotCoordinates`).
+        """
         points = np.transpose(tuple(map(np.array, line2d.get_data())))
+        if decimation is not None:
+            points = points[self._decimate(line2d, points, decimation, decimation_dpi, decimation_width)]
         coordsys = 'axis description cs' if line2d.get_transform() == line2d.axes.transAxes else None
 
+        ax = line2d.axes
+        lims, scales = (((0, 1), (0, 1)), ('linear', 'linear')) if coordsys else (
+            (ax.get_xlim(), ax.get_ylim()), (ax.get_xscale(), ax.get_yscale()))
+        if precision is not None:
+            fractions = precision / (_axes_size(ax, decimation_width) * 72.27)
+            kwargs.setdefault('num_fmt', [adaptive_num_fmt(lim, fraction, scale == 'log')
+                                          for lim, fraction, scale in zip(lims, fractions, scales)])
+        if shift and not coordsys:
+            kwargs.setdefault('offset', [shift_offset(lim) if scale == 'linear' else 0.
+                                         for lim, scale in zip(lims, scales)])
+
         options = {**{
             'color': mpl_color_to_tikz(line2d.get_color()),
             **mpl_linestyle_to_tikz(line2d.get_linestyle()),
@@ -33,16 +67,113 @@ class TikzLine2D(AddplotCoordinates):
 
         self._line2d = line2d
 
+    @staticmethod
+    def _decimate(line2d: Line2D, points: np.ndarray, method: str, dpi: float = None, width: float = None):
+        """Indices of `points` to keep when drawn at `dpi` in axes `width` inches wide.
+
+        By default, the axes keep their size in the matplotlib figure, and
+        the resolution is ``savefig.dpi`` (or the figure's dpi).
+        """
+        ax = line2d.axes
+        size = _axes_size(ax, width) * _output_dpi(ax, dpi)
+
+        pixels = (line2d.get_transform() - ax.transAxes).transform(points.astype(float).reshape(-1, 2)) * size
+        return decimate(*pixels.T, int(np.ceil(size[0])), method)
+
+
+def _axes_size(ax: Axes, width: float = None) -> np.ndarray:
+    # in inches, as in the figure or scaled to the given width
+    size = np.array((ax.bbox.width, ax.bbox.height)) / ax.figure.dpi
+    if width is not None:
+        size *= width / size[0]
+    return size
+
+
+def _output_dpi(ax: Axes, dpi: float = None) -> float:
+    if dpi is not None:
+        return dpi
+    return rcParams['savefig.dpi'] if rcParams['savefig.dpi'] != 'figure' else ax.figure.dpi
+
+
+RASTERIZED_TYPES = AxesImage, PathCollection, QuadMesh
+
+
+class TikzRasterized(AddplotGraphics):
+    """An artist (e.g. an image, a scatter plot or a mesh) drawn into a PNG file.
+
+    Only the artist is drawn, on a transparent background, in the area of
+    its axes at `dpi` (by default, as `TikzLine2D` decimates), and placed
+    over the current axes limits.
+    """
+
+    def __init__(self, artist: Artist, path: tp.Union[str, os.PathLike], tex_path: str = None,
+                 dpi: float = None, *args, **kwargs):
+        ax = artist.axes
+        imsave(path, self.rasterize(artist, _output_dpi(ax, dpi)))
+
+        (xmin, xmax), (ymin, ymax) = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+        kwargs.setdefault('zorder', artist.get_zorder())
+        super().__init__(PurePath(path if tex_path is None else tex_path).as_posix(),
+                         xmin, xmax, ymin, ymax, *args, **kwargs)
+
+        self._artist = artist
+
+    @staticmethod
+    def rasterize(artist: Artist, dpi: float) -> np.ndarray:
+        """RGBA pixels of `artist` inside its axes, flipped so that x and y increase to the right and up."""
+        ax, fig = artist.axes, artist.figure
+        old_dpi = fig.dpi
+        try:
+            fig.dpi = dpi
+            # as drawing the axes would, so that the pixels have the shape they have in the figure
+            ax.apply_aspect()
+            renderer = RendererAgg(ceil(fig.bbox.width), ceil(fig.bbox.height), dpi)
+            artist.draw(renderer)
+            x0, y0, x1, y1 = np.round(ax.bbox.extents).astype(int)
+            height = renderer.height
+        finally:
+            fig.dpi = old_dpi
+
+        pixels = np.asarray(renderer.buffer_rgba())[max(height - y1, 0):height - y0, max(x0, 0):x1]
+        return np.ascontiguousarray(pixels[::-1 if ax.yaxis_inverted() else 1, ::-1 if ax.xaxis_inverted() else 1])
+
 
 # TODO: Automatic style extraction
 # TODO: Legend
 def TikzAxes(ax: Axes, cls: tp.Type[PGFAbstractAxis] = PGFAxis, *args,
-             line2d_kwargs=frozendict(),
+             line2d_kwargs=frozendict(), table: tp.Union[str, os.PathLike, PGFTable] = None,
+             decimation: str = None, decimation_dpi: float = None, decimation_width: float = None,
+             precision: float = None, shift=False,
+             graphics: tp.Union[str, os.PathLike] = None, graphics_tex_path: str = None, graphics_dpi: float = None,
              **kwargs):
+    """An axis with the lines of `ax` and, given a `graphics` path prefix, its heavy artists.
+
+    Lines are written as coordinates (or into `table`), optionally decimated,
+    with the `precision` and `shift` of `TikzLine2D`.
+    Images, `PathCollection` (scatter) and `QuadMesh` (e.g. 2D histogram)
+    artists are rasterized into ``{graphics}-{i}.png`` files (referred to
+    in TeX with the `graphics_tex_path` prefix, if given) at `graphics_dpi`;
+    without `graphics`, they are skipped.
+    """
     options = {**{
         'xlabel': ax.get_xlabel(), 'ylabel': ax.get_ylabel(),
         'xmode': ax.get_xscale(), 'ymode': ax.get_yscale()
     }, **kwargs.pop('options', {})}
     ret = cls(*args, options=options, **kwargs)
-    ret.children += [TikzLine2D(line2d, options=line2d_kwargs) for line2d in ax.get_lines()]
+
+    own_table = table is not None and not isinstance(table, PGFTable)
+    if own_table:
+        table = PGFTable(table, num_fmt=TikzLine2D.num_fmt)
+    ret.children += [TikzLine2D(line2d, options=line2d_kwargs, table=table, decimation=decimation,
+                                decimation_dpi=decimation_dpi, decimation_width=decimation_width,
+                                precision=precision, shift=shift)
+                     for line2d in ax.get_lines()]
+    if graphics is not None:
+        heavy = [a for a in ax.get_children() if isinstance(a, RASTERIZED_TYPES) and a.get_visible()]
+        ret.children += [TikzRasterized(artist, f'{os.fspath(graphics)}-{i}.png',
+                                        None if graphics_tex_path is None else f'{graphics_tex_path}-{i}.png',
+                                        graphics_dpi)
+                         for i, artist in enumerate(heavy)]
+    if own_table:
+        table.write()
     return ret
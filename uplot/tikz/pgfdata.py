@@ -1,22 +1,40 @@
+import sys
+import typing as tp
 from collections.abc import Iterable, Mapping
 from dataclasses import dataclass
 from itertools import chain
 
 import numpy as np
-import torch
-from astropy.table import Table
 
 from .bases import Printable
 
+if tp.TYPE_CHECKING:
+    from astropy.table import Table
 
-_non_iterables = (str, np.ndarray, torch.Tensor)
 
+def _non_iterables():
+    # tensors can only have been made if torch was imported already, so don't import it here
+    torch = sys.modules.get('torch')
+    return (str, np.ndarray) + ((torch.Tensor,) if torch is not None else ())
 
-def nested_iterables(o, keys=()):
-    yield from (chain(*(
-        nested_iterables(v, keys + (k,))
-        for k, v in (o.items() if isinstance(o, Mapping) else enumerate(o))
-    )) if isinstance(o, Iterable) and not isinstance(o, _non_iterables) else ((keys, o),))
+
+def _items(o, keys):
+    for k, v in (o.items() if isinstance(o, Mapping) else enumerate(o)):
+        yield keys + (k,), v
+
+
+def nested_iterables(o, keys=(), non_iterables=None):
+    # depth first, with an explicit stack of iterators over (keys, value)
+    non_iterables = _non_iterables() if non_iterables is None else non_iterables
+    stack = [iter(((keys, o),))]
+    while stack:
+        for keys, o in stack[-1]:
+            if isinstance(o, Iterable) and not isinstance(o, non_iterables):
+                stack.append(_items(o, keys))
+                break
+            yield keys, o
+        else:
+            stack.pop()
 
 
 def record_to_dict(struct):
@@ -45,6 +63,55 @@ def to_pgfdata(data, namespace=None):
     return Printable(children=children, _header=r'\pgfkeys{', _footer=r'}', _joiner=',\n')
 
 
-def table_to_pgfdata(t: Table, index=None, namespace=None):
-    rowiter = ({key: record_to_dict(row[key]) for key in row.keys() if key != index} for row in t)
-    return to_pgfdata(dict(zip(t['i'], rowiter)) if index else rowiter, namespace=namespace)
+def _leaf_columns(columns: Mapping[str, np.ndarray], expand_subarrays=False) -> tp.Iterable[tp.Tuple[tp.Tuple[str, ...], np.ndarray]]:
+    # the fields of structured columns (and elements of subarrays), recursively, in order
+    stack = [((key,), col) for key, col in reversed(columns.items())]
+    while stack:
+        keys, col = stack.pop()
+        if col.dtype.names:
+            stack.extend((keys + (name,), col[name]) for name in reversed(col.dtype.names))
+        elif expand_subarrays and col.ndim > 1:
+            stack.extend((keys + (str(i),), col[:, i]) for i in reversed(range(col.shape[1])))
+        else:
+            yield keys, col
+
+
+def _column_to_str(col: np.ndarray) -> tp.Sequence[str]:
+    # like str() of each element, but bytes are decoded
+    if col.ndim == 1 and col.dtype.kind in 'biufcSU':
+        strs = np.asarray(col).astype(str)
+        if np.ma.is_masked(col):
+            strs[np.ma.getmaskarray(col)] = str(np.ma.masked)
+        return strs.tolist()
+    return list(map(str, col))
+
+
+def columns_to_pgfdata(columns: tp.Union[Mapping[str, np.ndarray], np.ndarray], index: tp.Sequence = None,
+                       namespace=None, keytype='initial', expand_subarrays=False):
+    """Like `to_pgfdata` of a sequence (or, with `index`, mapping) of rows, but by columns.
+
+    `columns` is a mapping of names to arrays (or a structured array),
+    whose fields, if structured, become nested keys. Numbers are converted
+    to strings a column at a time, and all lines are put in a single child.
+    Masked values are written as ``--`` and byte strings are decoded.
+
+    Multidimensional cells are written like ``str`` of an array, which is
+    slow, unless `expand_subarrays`, which gives each element its own key.
+    """
+    if isinstance(columns, np.ndarray):
+        columns = {name: columns[name] for name in columns.dtype.names}
+    leaves = list(_leaf_columns(columns, expand_subarrays))
+    nrows = len(leaves[0][1]) if leaves else 0
+    rowkeys = _column_to_str(np.asarray(index)) if index is not None else list(map(str, range(nrows)))
+
+    lines = [[f'{rowkey}/{path}/.{keytype}={{{val}}}' for rowkey, val in zip(rowkeys, _column_to_str(col))]
+             for keys, col in leaves for path in ['/'.join(keys)]]
+    children = [f'/{namespace}/.cd'] if namespace else []
+    if nrows and leaves:
+        children.append('\n'.join(chain.from_iterable(zip(*lines))))
+    return Printable(children=children, _header=r'\pgfkeys{', _footer=r'}', _joiner=',\n')
+
+
+def table_to_pgfdata(t: 'Table', index=None, namespace=None, expand_subarrays=False):
+    return columns_to_pgfdata({key: t[key] for key in t.colnames if key != index},
+                              index=t[index] if index else None, namespace=namespace, expand_subarrays=expand_subarrays)
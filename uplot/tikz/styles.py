@@ -0,0 +1,89 @@
+import re
+import typing as tp
+
+from .bases import Command, Optionable, Printable
+from .commands import AddplotCommand
+
+
+__all__ = 'StyledPicture', 'intern_styles'
+
+
+class StyledPicture(Printable):
+    """A tree preceded by the ``\\definecolor`` and style definitions it uses."""
+
+    _indent = ''
+
+    def __init__(self, root: Printable, preamble: tp.Iterable[str] = (), **kwargs):
+        super().__init__(children=[root], **kwargs)
+        self.preamble = list(preamble)
+
+    @property
+    def header(self):
+        return '\n'.join(self.preamble) if self.preamble else None
+
+
+_rgb = re.compile(r'rgb,1:red,(?P<red>[^;]+);green,(?P<green>[^;]+);blue,(?P<blue>[^;]+)')
+
+
+def _optionables(root: Printable) -> tp.Iterator[Optionable]:
+    # in the order of the output
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Optionable):
+            yield node
+        if isinstance(node, Printable):
+            stack.extend(reversed(node.children))
+
+
+def _style_setter(command: Command) -> str:
+    # styles for \addplot must be pgfplots keys, and for TikZ paths (e.g. \draw) TikZ keys
+    return 'pgfplotsset' if isinstance(command, AddplotCommand) else 'tikzset'
+
+
+def intern_styles(root: Printable, prefix='uplot', min_count=2, colors=True, styles=True) -> StyledPicture:
+    """Name the repeated colours and option sets in `root`, in place.
+
+    With `colors`, option values given as ``rgb,1:red,...`` (e.g. by
+    `mpl_color_to_tikz`) are replaced by colours named ``{prefix}colorN``.
+    With `styles`, the options of commands whose (formatted) options are
+    shared by at least `min_count` of them are replaced by a style named
+    ``{prefix}styleN``, unless the name is no shorter.
+
+    Returns a `StyledPicture` with the definitions before `root`, which
+    should be printed instead of it, e.g. at the start of a
+    ``tikzpicture``.
+    """
+    nodes = list(_optionables(root))
+    preamble = []
+
+    if colors:
+        names: tp.Dict[str, str] = {}
+        for node in nodes:
+            named = {}
+            for key, val in node.options.items():
+                if isinstance(val, str) and (m := _rgb.fullmatch(val)):
+                    if (name := names.get(val)) is None:
+                        name = names[val] = f'{prefix}color{len(names)}'
+                        preamble.append(rf'\definecolor{{{name}}}{{rgb}}{{{m["red"]},{m["green"]},{m["blue"]}}}')
+                    named[key] = name
+            if named:
+                node.options.update(named)
+
+    if styles:
+        groups: tp.Dict[tp.Tuple[str, str], tp.List[Command]] = {}
+        for node in nodes:
+            if isinstance(node, Command) and (options := node.formatted_options):
+                groups.setdefault((_style_setter(node), options), []).append(node)
+
+        nstyles = 0
+        for (setter, options), commands in groups.items():
+            name = f'{prefix}style{nstyles}'
+            if len(commands) < min_count or len(name) >= len(options):
+                continue
+            nstyles += 1
+            preamble.append(rf'\{setter}{{{name}/.style={{{options}}}}}')
+            for command in commands:
+                command.options, command.additional_options = {name: None}, ''
+
+    return StyledPicture(root, preamble)
@@ -0,0 +1,161 @@
+import os
+import typing as tp
+from pathlib import Path, PurePath
+
+import numpy as np
+
+from .bases import Printable
+from .pgfdata import _leaf_columns
+from .utils import _chains, _printf_args, format_chains
+
+
+__all__ = 'PGFTable', 'PGFTableFile', 'stream_table'
+
+
+class PGFTable:
+    """A columnar data file readable by ``\\addplot table``.
+
+    Each call to `add` stores the given points as new columns, so that
+    several plots can share a single file. Columns of different lengths are
+    padded with ``nan``, which pgfplots discards (or treats as a jump).
+    """
+
+    num_fmt = '.4e'
+    chunksize = 2**16
+    coordinate_names = 'xyz'
+
+    def __init__(self, path: tp.Union[str, os.PathLike], tex_path: str = None, num_fmt: str = None):
+        self.path = path
+        self.tex_path = PurePath(path if tex_path is None else tex_path).as_posix()
+        if num_fmt is not None:
+            self.num_fmt = num_fmt
+
+        self.columns: tp.Dict[str, np.ndarray] = {}
+        self.formats: tp.Dict[str, str] = {}
+        self._nadded = 0
+
+    def add(self, points: tp.Union[tp.Iterable[tp.Iterable[tp.Tuple[float, float]]], np.ndarray],
+            num_fmt: tp.Union[str, tp.Sequence[str]] = None) -> tp.Tuple[tp.Dict[str, str], bool]:
+        """Store `points` (a chain or a sequence of chains) as new columns.
+
+        The columns are written with `num_fmt` (one for all or one per
+        coordinate), or else the table's format.
+
+        Returns the ``table`` options that select the new columns and whether
+        there were several chains, separated by a ``nan`` row each, in which
+        case the plot should use ``unbounded coords=jump``.
+        """
+        chains = [np.asarray(ch, dtype=float).reshape(len(ch), -1) for ch in _chains(points)]
+        ndim = chains[0].shape[-1]
+        data = np.concatenate([
+            _ for ch in chains for _ in (np.full((1, ndim), np.nan), ch)
+        ][1:]) if len(chains) > 1 else chains[0]
+
+        names = [f'{c}{self._nadded}' for c in self.coordinate_names[:ndim]]
+        self.columns.update(zip(names, data.T))
+        if num_fmt is not None:
+            self.formats.update(zip(names, [num_fmt] * ndim if isinstance(num_fmt, str) else num_fmt))
+        self._nadded += 1
+        return dict(zip(self.coordinate_names, names)), len(chains) > 1
+
+    @property
+    def nrows(self):
+        return max(map(len, self.columns.values()), default=0)
+
+    def write(self):
+        with open(self.path, 'w') as f:
+            f.write(' '.join(self.columns.keys()))
+            num_fmt = [self.formats.get(name, self.num_fmt) for name in self.columns] if self.formats else self.num_fmt
+            for start in range(0, self.nrows, self.chunksize):
+                block = np.full((min(self.chunksize, self.nrows - start), len(self.columns)), np.nan)
+                for i, col in enumerate(self.columns.values()):
+                    col = col[start:start + len(block)]
+                    block[:len(col), i] = col
+                f.write('\n')
+                f.write(format_chains([block], ' '.join, num_fmt, sep='\n'))
+            f.write('\n')
+        return self
+
+
+class PGFTableFile(Printable):
+    """A reference to a table file, e.g. written by `stream_table`.
+
+    Prints as ``\\pgfplotstableread`` into the `macro`, if given, so that
+    plots can use ``\\addplot table[x=..., y=...]{\\macro}``.
+    """
+
+    _indent = ''
+
+    def __init__(self, tex_path: str, names: tp.Sequence[str] = (), nrows: int = None, macro: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.tex_path, self.names, self.nrows, self.macro = tex_path, list(names), nrows, macro
+        if macro is not None:
+            self.children.append(rf'\pgfplotstableread{{{tex_path}}}{{\{macro}}}')
+
+
+def _column_printf(col: np.ndarray, num_fmt: str) -> tp.Tuple[str, list]:
+    if np.ma.is_masked(col):
+        col = np.ma.filled(col.astype(float), np.nan)
+    col = np.asarray(col)
+    if col.dtype.kind in 'biu':
+        return '%d', col.tolist()
+    if col.dtype.kind in 'SU':
+        return '{%s}', col.astype(str).tolist()
+    return _printf_args(col, num_fmt)
+
+
+def _row_chunks(rows, chunksize: int) -> tp.Iterable[tp.Dict[str, np.ndarray]]:
+    # slice the rows before the columns, so that memory maps only read (and e.g. FITS only converts) a chunk
+    if isinstance(rows, np.ndarray):
+        for start in range(0, len(rows), chunksize):
+            chunk = rows[start:start + chunksize]
+            yield {name: chunk[name] for name in rows.dtype.names}
+    else:
+        columns = {name: rows[name] for name in getattr(rows, 'colnames', None) or rows.keys()}
+        for start in range(0, max(map(len, columns.values()), default=0), chunksize):
+            yield {name: col[start:start + chunksize] for name, col in columns.items()}
+
+
+def stream_table(rows, path: tp.Union[str, os.PathLike], tex_path: str = None, macro: str = None,
+                 num_fmt: str = None, chunksize: int = None, hdu: tp.Union[int, str] = 1) -> PGFTableFile:
+    """Write a table to a pgfplotstable file chunk by chunk.
+
+    `rows` is a structured array (e.g. a `np.memmap` or FITS data), a
+    mapping of column names to arrays, or an astropy ``Table``, or the path
+    of a ``.npy`` or FITS file (of which HDU `hdu`), which is memory-mapped.
+    Only `chunksize` rows are in memory at a time.
+
+    The fields of structured columns and the elements of multidimensional
+    ones become separate columns, named like the keys of `columns_to_pgfdata`.
+    Floats are written with `num_fmt`, integers in full, strings in braces,
+    and masked values as ``nan``.
+    """
+    num_fmt = num_fmt or PGFTable.num_fmt
+    chunksize = chunksize or PGFTable.chunksize
+
+    if isinstance(rows, (str, os.PathLike)):
+        if Path(rows).suffix == '.npy':
+            return stream_table(np.load(rows, mmap_mode='r'), path, tex_path, macro, num_fmt, chunksize)
+        from astropy.io import fits
+
+        with fits.open(rows, memmap=True) as hdul:
+            return stream_table(hdul[hdu].data, path, tex_path, macro, num_fmt, chunksize)
+
+    names, nrows = None, 0
+    with open(path, 'w') as f:
+        for chunk in _row_chunks(rows, chunksize):
+            leaves = [('/'.join(keys), col) for keys, col in _leaf_columns(chunk, expand_subarrays=True)]
+            if names is None:
+                names = [name for name, _ in leaves]
+                f.write(' '.join(names))
+            n = len(leaves[0][1])
+            fields, values = zip(*(_column_printf(col, num_fmt) for _, col in leaves))
+            block = np.empty((n, len(leaves)), dtype=object)
+            for i, vals in enumerate(values):
+                block[:, i] = vals
+            f.write('\n')
+            f.write('\n'.join([' '.join(fields)] * n) % tuple(block.reshape(-1).tolist()))
+            nrows += n
+        f.write('\n')
+
+    return PGFTableFile(PurePath(path if tex_path is None else tex_path).as_posix(), names or (), nrows, macro)
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-from itertools import cycle
-from typing import Iterable, Optional, Union
+import re
+from functools import lru_cache
+from itertools import chain, cycle
+from math import ceil, floor, isfinite, log, log10
+from typing import Callable, Iterable, Optional, Sequence, Union
 
 import numpy as np
-from matplotlib import rcParams
-from matplotlib.colors import to_rgb
 from more_itertools import spy
 
+from ..utils.lazy import lazy_import
+
+mpl = lazy_import('matplotlib')
+mcolors = lazy_import('matplotlib.colors')
+
 
 rc = {
     'ls_num_fmt': '.1f',
@@ -18,18 +24,39 @@ _mpl_color_shorthands = {
     'm': 'magenta', 'y': 'yellow', 'k': 'black', 'w': 'white'}
 
 
+_cycle_reference = re.compile(r'C\d+')
+# the colours of the last seen axes.prop_cycle
+_cycle_colors: list = [None, ()]
+
+
+def _prop_cycle_color(n: int):
+    # bypass the (slow) validating rcParams lookup; the colours are only recomputed when the cycle is replaced
+    prop_cycle = dict.__getitem__(mpl.rcParams, 'axes.prop_cycle')
+    if _cycle_colors[0] is not prop_cycle:
+        _cycle_colors[:] = prop_cycle, prop_cycle.by_key()['color']
+    colors = _cycle_colors[1]
+    return colors[n % len(colors)]
+
+
 def mpl_color_to_tikz(color) -> str:
-    if isinstance(color, str) and color[0] == 'C' and (color := int(color[1:])):
-        pc = rcParams["axes.prop_cycle"].by_key()
-        color = pc[color % len(pc)]
+    if isinstance(color, str) and _cycle_reference.fullmatch(color):
+        color = _prop_cycle_color(int(color[1:]))
+    try:
+        return _color_to_tikz(color, rc['clr_gray_num_fmt'])
+    except TypeError:  # unhashable, e.g. an array
+        return _color_to_tikz.__wrapped__(color, rc['clr_gray_num_fmt'])
+
+
+@lru_cache(maxsize=1024)
+def _color_to_tikz(color, num_fmt: str) -> str:
     if isinstance(color, str):
         try:
-            color = format(100-100*float(color), rc["clr_gray_num_fmt"]).split(".")
+            color = format(100-100*float(color), num_fmt).split(".")
             return f'black!{color[0]}.{color[1].rstrip("0")}'
         except ValueError as e:
             if color[0] != '#':
                 return _mpl_color_shorthands.get(color, color)
-    return 'rgb,1:red,{};green,{};blue,{}'.format(*(format(val, rc['clr_gray_num_fmt']) for val in to_rgb(color)))
+    return 'rgb,1:red,{};green,{};blue,{}'.format(*(format(val, num_fmt) for val in mcolors.to_rgb(color)))
 
 
 _mpl_linestyles = {
@@ -47,27 +74,98 @@ def mpl_linestyle_to_tikz(ls) -> dict[str, Optional[str]]:
                 'dash pattern': ' '.join(f'{format(s, rc["ls_num_fmt"])}pt {onoff}' for s, onoff in zip(ls[1], cycle(('on', 'off'))))}
 
 
+_printf_compatible = re.compile(r'-?(?P<spec>[+ ]?#?0?\d*(?:\.\d+)?[eEfFgG])')
+
+
+def _printf_args(values: np.ndarray, num_fmt: str) -> tuple[str, list]:
+    # printf-style formatting of floats goes through the same routine as
+    # format(), so a compatible spec gives identical strings in a single pass
+    if values.dtype.kind in 'biuf' and (m := _printf_compatible.fullmatch(num_fmt)):
+        return '%' + m['spec'], values.tolist()
+    return '%s', [format(v, num_fmt) for v in values.tolist()]
+
+
+def _escape_printf(s: str) -> str:
+    return s.replace('%', '%%')
+
+
+def format_chains(chains: Sequence[np.ndarray], point: Callable[[Sequence[str]], str], num_fmt=None,
+                  sep=' ', chain_sep=r'\par') -> str:
+    """Format ragged chains of points with a single string-formatting operation.
+
+    `point(fields)` should return the printf template for one point, with
+    its coordinates given by `fields` and literal ``%`` escaped. Each
+    number is rendered as ``format(number, num_fmt)``, where `num_fmt` can
+    also be a sequence with a format for each coordinate.
+    """
+    num_fmt = num_fmt or '.6g'
+    chains = [np.asarray(ch) for ch in chains]
+    if not chains:
+        return ''
+    ndim = chains[0].shape[-1]
+    data = chains[0] if len(chains) == 1 else np.concatenate([ch.reshape(-1, ndim) for ch in chains])
+    if isinstance(num_fmt, str):
+        field, args = _printf_args(data.reshape(-1), num_fmt)
+        fields = (field,) * ndim
+    else:
+        fields, columns = zip(*(_printf_args(data[..., i].reshape(-1), fmt) for i, fmt in enumerate(num_fmt)))
+        args = list(chain.from_iterable(zip(*columns)))
+    sep, chain_sep, template = _escape_printf(sep), _escape_printf(chain_sep), point(fields)
+    return chain_sep.join(sep.join([template] * len(ch)) for ch in chains) % tuple(args)
+
+
+def _decimals(step: float) -> int:
+    # rounding to this many decimals moves numbers by at most step (half of 10**-decimals <= step)
+    return max(0, ceil(-log10(2 * step)))
+
+
+def adaptive_num_fmt(lims: Sequence[float], precision: float, log_scale=False) -> str:
+    """The shortest format that resolves a `precision` fraction of the range `lims`.
+
+    On linear axes, this is a fixed-point format, so numbers get no more
+    digits than the axis can show. On `log_scale` axes, the precision is
+    relative to the numbers, so it is an exponential format with enough
+    significant digits. Degenerate ranges get the default ``.6g``.
+    """
+    lo, hi = sorted(map(float, lims))
+    step = precision * (log(hi / lo) if log_scale else hi - lo) if lo > 0 or not log_scale else np.nan
+    if not (step > 0 and isfinite(step)):
+        return '.6g'
+    return f'.{_decimals(step)}{"e" if log_scale else "f"}'
+
+
+def shift_offset(lims: Sequence[float], ratio=10.) -> float:
+    """A round number to subtract from coordinates far from zero, or ``0``.
+
+    Coordinates are considered far when their midpoint is more than `ratio`
+    times the range `lims` away from zero; then the offset is the midpoint
+    rounded to the order of magnitude of the range, so that the shifted
+    coordinates need about as many digits as the range.
+    """
+    lo, hi = sorted(map(float, lims))
+    centre, span = (lo + hi) / 2, hi - lo
+    if not (span > 0 and isfinite(centre)) or abs(centre) <= ratio * span:
+        return 0.
+    unit = 10 ** floor(log10(span))
+    return float(f'{round(centre / unit) * unit:.15g}')
+
+
+def _chains(points):
+    return [points] if np.array(spy(points)[0][0]).ndim == 1 else points
+
+
 def segs_to_coords(segs, *args, **kwargs):
     return r'\par'.join(points_to_coords(s, *args, **kwargs) for s in segs)
 
 
 def points_to_coords(points: Union[Iterable[Iterable[tuple[float, float]]], np.ndarray], num_fmt=None, coordsys=None):
-    num_fmt = num_fmt or '.6g'
-    coordsys = f'{coordsys}:' if coordsys else ''
-
-    return r'\par'.join(
-        ' '.join(f'({coordsys}{", ".join(format(_p, num_fmt) for _p in p)})' for p in ch)
-        for ch in ([points] if np.array(spy(points)[0][0]).ndim == 1 else points)
-    )
+    coordsys = _escape_printf(f'{coordsys}:' if coordsys else '')
+    return format_chains(_chains(points), lambda fields: f'({coordsys}{", ".join(fields)})', num_fmt)
 
 
 def points3d_to_metacoords(points: Union[Iterable[Iterable[tuple[float, float, float]]], Iterable[tuple[float, float, float]], np.ndarray], num_fmt=None, coordsys=None):
-    num_fmt = num_fmt or '.6g'
-    coordsys = f'{coordsys}:' if coordsys else ''
+    coordsys = _escape_printf(f'{coordsys}:' if coordsys else '')
     points = np.array(points)
-    return r' \par '.join(
-        ' '.join(f'({coordsys}{fa[0]}, {fa[1]}) [{fa[2]}]' for a in row
-                 for fa in [[format(_p, num_fmt) for _p in a]])
-        for row in (points if points.ndim == 3 else [points])
-    )
-
+    return format_chains(points if points.ndim == 3 else [points],
+                         lambda fields: f'({coordsys}{fields[0]}, {fields[1]}) [{fields[2]}]', num_fmt,
+                         chain_sep=r' \par ')
@@ -5,16 +5,22 @@ from operator import attrgetter, is_not
 from typing import Iterable
 
 import numpy as np
-# from matplotlib import pyplot as plt
-from matplotlib.axes import Axes
-from matplotlib.axis import Ticker
-from matplotlib.ticker import AutoLocator, Formatter, Locator, NullFormatter
 from more_itertools import consume
 
+from .lazy import lazy_import
 
-def unshare(ax: Axes, axis: tp.Literal['x', 'y', 'xy'] = 'xy',
-            locator: tp.Union[tp.Type[Locator], Locator] = AutoLocator,
-            formatter: tp.Union[tp.Type[Formatter], Formatter] = NullFormatter):
+if tp.TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.axis import Axis
+    from matplotlib.ticker import Formatter, Locator
+
+maxis = lazy_import('matplotlib.axis')
+mticker = lazy_import('matplotlib.ticker')
+
+
+def unshare(ax: 'Axes', axis: tp.Literal['x', 'y', 'xy'] = 'xy',
+            locator: tp.Union[tp.Type['Locator'], 'Locator'] = None,
+            formatter: tp.Union[tp.Type['Formatter'], 'Formatter'] = None):
     for xy in axis:
         grouper = getattr(ax, f'get_shared_{xy}_axes')()
         axis = getattr(ax, f'{xy}axis')
@@ -25,9 +31,18 @@ def unshare(ax: Axes, axis: tp.Literal['x', 'y', 'xy'] = 'xy',
                             islice(filter(partial(is_not, ax), grouper.get_siblings(ax)), 1))))
         grouper.remove(ax)
 
-        axis.major = Ticker()
-        axis.set_major_locator(locator() if isinstance(locator, type) else locator)
-        axis.set_major_formatter(formatter() if isinstance(formatter, type) else formatter)
+        axis.major = maxis.Ticker()
+        set_major(axis, locator, formatter)
+
+
+def set_major(axis: 'Axis',
+              locator: tp.Union[tp.Type['Locator'], 'Locator'] = None,
+              formatter: tp.Union[tp.Type['Formatter'], 'Formatter'] = None):
+    # None stands for the defaults, AutoLocator and NullFormatter, which are imported lazily
+    locator = mticker.AutoLocator if locator is None else locator
+    formatter = mticker.NullFormatter if formatter is None else formatter
+    axis.set_major_locator(locator() if isinstance(locator, type) else locator)
+    axis.set_major_formatter(formatter() if isinstance(formatter, type) else formatter)
 
 
 def _rowwise_combinations(iterable_or_length: tp.Union[tp.Iterable, int], iterable_2: tp.Iterable = None, take_from: tp.Iterable = None, replacement=False, return_indices=False):
@@ -40,9 +55,17 @@ def _rowwise_combinations(iterable_or_length: tp.Union[tp.Iterable, int], iterab
     if iterable_2 is None:
         iterable_2 = iterable_or_length
 
-    itake_from = iter(take_from) if take_from is not None else None
+    if take_from is None:
+        # only generate the pairs that are kept
+        items_2 = list(aux(iterable_2))
+        for i, item_i in aux(iterable_or_length):
+            for j, item_j in items_2[:i + replacement]:
+                yield ((i, j), (item_i, item_j)) if return_indices else (item_i, item_j)
+        return
+
+    itake_from = iter(take_from)
     for (i, item_i), (j, item_j) in product(aux(iterable_or_length), aux(iterable_2)):
-        res = next(itake_from) if itake_from is not None else (item_i, item_j)
+        res = next(itake_from)
         if j > i or (j == i and not replacement):
             continue
         yield ((i, j), res) if return_indices else res
@@ -58,3 +81,21 @@ def _to_nd_obj_array(obj: np.ndarray, ndim=-1) -> np.ndarray:
     out = np.empty(int(np.prod(obj.shape[:ndim])), dtype=object)
     out[:] = list(obj.reshape(-1, *obj.shape[ndim:]))
     return np.atleast_1d(out.reshape(obj.shape[:ndim]))
+
+
+def _intern(objs: tp.Iterable) -> tp.Tuple[tp.List, np.ndarray]:
+    """Return the distinct objects and, for each input, the index of its distinct version.
+
+    Mappings are compared by their items. Unhashable objects are not deduplicated.
+    """
+    index, unique, inverse = {}, [], []
+    for obj in objs:
+        key = tuple(obj.items()) if isinstance(obj, tp.Mapping) else obj
+        try:
+            k = index.setdefault(key, len(unique))
+        except TypeError:
+            k = len(unique)
+        if k == len(unique):
+            unique.append(obj)
+        inverse.append(k)
+    return unique, np.array(inverse, dtype=int)
@@ -0,0 +1,72 @@
+import typing as tp
+
+import numpy as np
+
+
+__all__ = 'minmax_decimate', 'lttb_decimate', 'decimate', 'DECIMATION_METHODS'
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, ncols: int) -> np.ndarray:
+    """Indices of the points to keep so that every pixel column keeps its envelope.
+
+    `x` is in units of pixel columns, with the visible range in ``[0, ncols)``.
+    For each run of consecutive points inside the same column, the first,
+    lowest, highest and last point are kept. Points outside the visible range
+    collapse into a single column on each side, and the first ``nan`` of each
+    gap is kept to preserve the break in the line.
+    """
+    n = len(y)
+    if n < 5:
+        return np.arange(n)
+
+    isnan = np.isnan(x) | np.isnan(y)
+    columns = np.where(isnan, -2, np.clip(np.floor(np.where(isnan, 0, x)), -1, ncols)).astype(int)
+    y = np.where(isnan, np.nan, y)
+
+    starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    idx = np.arange(n)
+
+    keep = [starts, starts + lengths - 1, np.flatnonzero(isnan & ~np.r_[False, isnan[:-1]])]
+    with np.errstate(invalid='ignore'):
+        for reduce in (np.fmin, np.fmax):
+            extreme = np.repeat(reduce.reduceat(y, starts), lengths)
+            keep.append(np.minimum.reduceat(np.where(y == extreme, idx, n), starts))
+    keep = np.unique(np.concatenate(keep))
+    return keep[keep < n]
+
+
+def lttb_decimate(x: np.ndarray, y: np.ndarray, nout: int) -> np.ndarray:
+    """Indices of the points selected by Largest-Triangle-Three-Buckets.
+
+    `x` and `y` should be in display units (e.g. pixels), so that triangle
+    areas reflect what is visible. Only finite points are considered.
+    """
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    x, y = x[finite], y[finite]
+    n = len(finite)
+    if nout >= n or nout < 3:
+        return finite
+
+    # nout - 2 buckets over the points between the (always kept) first and last
+    edges = np.linspace(1, n - 1, nout - 1).astype(int)
+    lengths = np.diff(edges)
+    next_x, next_y = (np.r_[np.add.reduceat(a[1:-1], edges[:-1] - 1)[1:] / lengths[1:], a[-1]] for a in (x, y))
+
+    out = np.empty(nout, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        area = np.abs((x[a] - next_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[b] - y[a]))
+        a = out[b + 1] = lo + np.argmax(area)
+    return finite[out]
+
+
+DECIMATION_METHODS: tp.Dict[str, tp.Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    'minmax': minmax_decimate,
+    'lttb': lttb_decimate,
+}
+
+
+def decimate(x: np.ndarray, y: np.ndarray, ncols: int, method: str = 'minmax') -> np.ndarray:
+    return DECIMATION_METHODS[method](x, y, ncols)
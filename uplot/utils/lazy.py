@@ -0,0 +1,22 @@
+import sys
+from importlib import import_module
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Unlike `importlib.util.LazyLoader`, this does not import the parent
+    packages either, so e.g. ``lazy_import('matplotlib.pyplot')`` costs
+    nothing until it is used.
+    """
+
+    def __getattr__(self, item):
+        return getattr(import_module(self.__name__), item)
+
+    def __dir__(self):
+        return dir(import_module(self.__name__))
+
+
+def lazy_import(name: str) -> ModuleType:
+    return sys.modules.get(name) or LazyModule(name)
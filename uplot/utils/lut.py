@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import typing as tp
+
+import numpy as np
+
+if tp.TYPE_CHECKING:
+    from matplotlib.colors import Colormap, Normalize
+
+
+__all__ = 'colormap_lut', 'apply_lut'
+
+_luts: tp.Dict[int, tp.Tuple[Colormap, np.ndarray]] = {}
+
+
+def colormap_lut(cmap: Colormap) -> np.ndarray:
+    """The ``(N + 3, 4)`` uint8 RGBA table of `cmap`, as `apply_lut` needs it.
+
+    Rows ``N``, ``N + 1`` and ``N + 2`` are the under, over and bad colours,
+    like in `Colormap`. The table is made once per colormap object, so
+    changes to the colormap after the first call are not reflected.
+    """
+    cached = _luts.get(id(cmap))
+    if cached is None or cached[0] is not cmap:
+        # integers index the table directly: -1 is under and N over
+        lut = np.concatenate([cmap(np.r_[np.arange(cmap.N), -1, cmap.N], bytes=True),
+                              cmap(np.array([np.nan]), bytes=True)])
+        cached = _luts[id(cmap)] = cmap, lut
+    return cached[1]
+
+
+def _normalized(img, norm: Normalize) -> tp.Tuple[np.ndarray, np.ndarray]:
+    from matplotlib.colors import Normalize
+
+    if type(norm) is Normalize and not norm.clip and norm.vmin != norm.vmax:
+        # as Normalize does it, without masked arrays
+        mask = np.ma.getmaskarray(img) if np.ma.isMaskedArray(img) else None
+        img = np.ma.getdata(img)
+        x = np.subtract(img, norm.vmin, dtype=img.dtype if img.dtype.kind == 'f' else np.promote_types(img.dtype, np.float32))
+        x /= norm.vmax - norm.vmin
+        return x, np.isnan(x) if mask is None else mask | np.isnan(x)
+    x = norm(img)
+    return np.ma.getdata(x).astype(float), np.ma.getmaskarray(x) | np.isnan(np.ma.getdata(x))
+
+
+def apply_lut(img, lut: np.ndarray, norm: Normalize) -> np.ndarray:
+    """The uint8 RGBA image of ``cmap(norm(img), bytes=True)``, given ``lut = colormap_lut(cmap)``.
+
+    Images of (unmasked) 8 or 16-bit integers are looked up in a table of
+    the colours of all their possible values.
+    """
+    if isinstance(img, np.ndarray) and not np.ma.isMaskedArray(img) and img.dtype.kind in 'iu' and img.dtype.itemsize <= 2:
+        info = np.iinfo(img.dtype)
+        values = np.arange(info.min, info.max + 1).astype(img.dtype)
+        return _take(_apply_lut(values, lut, norm), img.astype(np.intp) - info.min if info.min else img)
+    return _apply_lut(img, lut, norm)
+
+
+def _take(lut: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # gathering whole pixels as uint32 is several times faster than rows of 4 uint8
+    return np.ascontiguousarray(lut).view(np.uint32).ravel()[idx].view(np.uint8).reshape(idx.shape + (4,))
+
+
+def _apply_lut(img, lut: np.ndarray, norm: Normalize) -> np.ndarray:
+    n = len(lut) - 3
+    x, bad = _normalized(img, norm)
+    x *= n
+    x[x < 0] = -1
+    x[x == n] = n - 1
+    np.clip(x, -1, n, out=x)
+    with np.errstate(invalid='ignore'):
+        idx = x.astype(int)
+    idx[idx > n - 1] = n + 1
+    idx[idx < 0] = n
+    idx[bad] = n + 2
+    return _take(lut, idx)
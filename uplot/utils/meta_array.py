@@ -1,7 +1,50 @@
+import json
+import mmap
+import os
+import typing as tp
+
 import numpy as np
 
 
+SIDECAR_SUFFIX = '.meta.json'
+
+
+def _descr(d):
+    # JSON turns the tuples in a dtype descr into lists
+    return d if isinstance(d, str) else [
+        (tuple(name) if isinstance(name, list) else name, _descr(sub), *map(tuple, shape))
+        for name, sub, *shape in d
+    ]
+
+
+def _memmap_base(arr: np.ndarray) -> tp.Optional[np.memmap]:
+    while arr is not None and not isinstance(arr, np.memmap):
+        arr = getattr(arr, 'base', None)
+    return arr if isinstance(arr, np.memmap) and arr.filename is not None and arr._mmap is not None else None
+
+
+def _file_offset(arr: np.ndarray, mm: np.memmap) -> int:
+    # memmaps sliced from another keep its offset, so locate arr in the mapping itself,
+    # which starts at the offset of the memmap that created it, rounded down to the granularity
+    start = mm.offset - mm.offset % mmap.ALLOCATIONGRANULARITY
+    return arr.__array_interface__['data'][0] - np.frombuffer(mm._mmap, dtype=np.uint8).ctypes.data + start
+
+
+def _rebuild_memmapped(cls, filename, mode, dtype, shape, strides, offset, meta):
+    buffer = np.memmap(filename, dtype=np.uint8, mode=mode)
+    return cls(shape, dtype, buffer=buffer, offset=offset, strides=strides, meta=meta)
+
+
 class MetaArray(np.ndarray):
+    """An array with a `meta` dict, which views (and slices) share.
+
+    Arrays backed by a memory map (see `MetaArray.memmap`) are pickled as a
+    reference to the file, the position of the data in it and `meta`, so
+    they can be sent to other processes without copying the data.
+    """
+
+    meta: tp.Dict[str, tp.Any]
+
     def __new__(cls, shape, dtype=float, buffer=None, offset=0,
                 strides=None, order=None, meta=None):
         obj = super().__new__(cls, shape, dtype, buffer, offset, strides, order)
@@ -11,12 +54,57 @@ class MetaArray(np.ndarray):
     def __array_finalize__(self, obj):
         if obj is None:
             return
-        self.metadata = getattr(obj, 'metadata', {})
+        self.meta = getattr(obj, 'meta', {})
+
+    @classmethod
+    def memmap(cls, filename: tp.Union[str, os.PathLike], dtype=None, mode='r', offset=None,
+               shape=None, order=None, meta=None) -> 'MetaArray':
+        """Memory-map `filename` with the layout and `meta` from its sidecar.
+
+        The sidecar is a small JSON file at ``filename + SIDECAR_SUFFIX``.
+        Arguments that are given override its contents. It is written when
+        the file is created (mode ``'w+'``), or when `meta` is given in mode
+        ``'r+'``.
+        """
+        sidecar = os.fspath(filename) + SIDECAR_SUFFIX
+        stored = {}
+        if mode != 'w+' and os.path.exists(sidecar):
+            with open(sidecar) as f:
+                stored = json.load(f)
+
+        if dtype is None:
+            dtype = _descr(stored['dtype']) if 'dtype' in stored else float
+        dtype = np.dtype(dtype)
+        shape = tuple(stored['shape']) if shape is None and 'shape' in stored else shape
+        offset = stored.get('offset', 0) if offset is None else offset
+        order = stored.get('order', 'C') if order is None else order
+        meta = stored.get('meta', {}) if meta is None else meta
+
+        obj = np.memmap(filename, dtype=dtype, mode=mode, offset=offset, shape=shape, order=order).view(cls)
+        obj.meta = meta
+
+        if mode == 'w+' or (mode == 'r+' and stored.get('meta') != meta):
+            with open(sidecar, 'w') as f:
+                json.dump({'dtype': np.lib.format.dtype_to_descr(dtype), 'shape': obj.shape,
+                           'offset': offset, 'order': order, 'meta': meta}, f)
+        return obj
+
+    def flush(self):
+        """Write changes to the file, like `numpy.memmap.flush`, if the array is memory-mapped."""
+        mm = _memmap_base(self)
+        if mm is not None and mm.mode != 'r':
+            mm.flush()
 
     def __reduce__(self):
+        mm = _memmap_base(self)
+        if mm is not None and mm.mode != 'c':  # copy-on-write changes are not in the file
+            self.flush()
+            return _rebuild_memmapped, (type(self), mm.filename, 'r' if mm.mode == 'r' else 'r+',
+                                        self.dtype, self.shape, self.strides, _file_offset(self, mm), self.meta)
+
         reduced = super().__reduce__()
         return reduced[:2] + (reduced[2] + (self.meta,),)
 
     def __setstate__(self, state, **kwargs):
-        self.meta = state[-1]  # Set the info attribute
+        self.meta = state[-1]
         super().__setstate__(state[:-1])
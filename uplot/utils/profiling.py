@@ -0,0 +1,190 @@
+"""Opt-in timing (and allocation) statistics for the phases of the pipelines.
+
+Methods marked with `instrumented` are recorded while a `profile` is
+active, under the name ``Class.method``: the number of calls, their total
+wall time and, with ``memory=True``, the largest increase of memory traced
+by `tracemalloc` during a call. Recursive calls (e.g. of `Printable.write_to` given a path)
+are counted, but only the outermost is timed, so times include those of
+the nested phases.
+
+The marked methods are only wrapped while profiling, so otherwise they run
+exactly as if they were not marked. Setting the environment variable
+``UPLOT_PROFILE`` profiles the whole process and, at exit, writes the
+statistics as JSON to the file it names, or prints them to stderr if it is
+``1``; ``UPLOT_PROFILE_MEMORY=1`` also traces memory.
+
+Profiling is not thread-safe.
+"""
+
+import atexit
+import json
+import os
+import sys
+import typing as tp
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from functools import wraps
+from time import perf_counter
+
+
+__all__ = 'instrumented', 'profile', 'Profile', 'PhaseStats', 'ENV_VAR', 'ENV_VAR_MEMORY'
+
+ENV_VAR = 'UPLOT_PROFILE'
+ENV_VAR_MEMORY = 'UPLOT_PROFILE_MEMORY'
+
+_T = tp.TypeVar('_T', bound=tp.Callable)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    time: float = 0.
+    peak_memory: tp.Optional[int] = None
+
+
+class Profile:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases: tp.Dict[str, PhaseStats] = {}
+
+    def _add(self, name: str, elapsed: float, peak: tp.Optional[int]):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        stats.calls += 1
+        stats.time += elapsed
+        if peak is not None and self.memory:
+            stats.peak_memory = max(stats.peak_memory or 0, peak)
+
+    def to_dict(self) -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+        return {name: asdict(stats) for name, stats in self.phases.items()}
+
+    def dump(self, fp: tp.Union[str, os.PathLike, tp.TextIO]):
+        if isinstance(fp, (str, os.PathLike)):
+            with open(fp, 'w') as f:
+                return self.dump(f)
+        json.dump(self.to_dict(), fp, indent=2)
+
+    def __str__(self):
+        rows = sorted(self.phases.items(), key=lambda item: -item[1].time)
+        width = max((len(name) for name, _ in rows), default=0)
+        return '\n'.join(
+            f'{name:{width}} {stats.calls:8d} calls {1e3 * stats.time:10.2f} ms'
+            + (f' {stats.peak_memory / 2**20:10.2f} MiB' if stats.peak_memory is not None else '')
+            for name, stats in rows
+        )
+
+
+_targets: tp.List[tp.Tuple[type, str, tp.Callable]] = []
+_profiles: tp.List[Profile] = []
+_depth: tp.Dict[str, int] = {}
+# for each phase being traced: the memory at its start and the largest seen so far
+_memory_frames: tp.List[tp.List[int]] = []
+
+
+def _tracing() -> bool:
+    return any(prof.memory for prof in _profiles)
+
+
+def _update_memory_frames():
+    import tracemalloc
+
+    current, peak = tracemalloc.get_traced_memory()
+    for frame in _memory_frames:
+        frame[1] = max(frame[1], peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+def _wrap(name: str, func: _T) -> _T:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        depth = _depth.get(name, 0)
+        _depth[name] = depth + 1
+        traced = depth == 0 and _tracing()
+        if traced:
+            current = _update_memory_frames()
+            _memory_frames.append([current, current])
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start if depth == 0 else 0.
+            _depth[name] = depth
+            peak = None
+            if traced:
+                _update_memory_frames()
+                base, top = _memory_frames.pop()
+                peak = top - base
+            for prof in _profiles:
+                prof._add(name, elapsed, peak)
+    return wrapper
+
+
+def _patch(owner: type, attr: str, func: tp.Callable):
+    setattr(owner, attr, _wrap(f'{owner.__qualname__}.{attr}', func))
+
+
+class _Instrumented:
+    # replaces itself with the function in the class, remembering where it is
+    def __init__(self, func: tp.Callable):
+        self.func = func
+
+    def __set_name__(self, owner, name):
+        _targets.append((owner, name, self.func))
+        if _profiles:
+            _patch(owner, name, self.func)
+        else:
+            setattr(owner, name, self.func)
+
+
+def instrumented(func: _T) -> _T:
+    """Mark a method (in a class body) to be recorded while profiling."""
+    return tp.cast(_T, _Instrumented(func))
+
+
+@contextmanager
+def profile(memory=False) -> tp.Iterator[Profile]:
+    """Record the `instrumented` phases that run in the context into a `Profile`.
+
+    Profiles can be nested; each records everything that runs while it is
+    active.
+    """
+    prof = Profile(memory)
+    stop_tracing = False
+    if memory:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            stop_tracing = True
+    if not _profiles:
+        for owner, attr, func in _targets:
+            _patch(owner, attr, func)
+    _profiles.append(prof)
+    try:
+        yield prof
+    finally:
+        _profiles.remove(prof)
+        if not _profiles:
+            for owner, attr, func in _targets:
+                setattr(owner, attr, func)
+        if stop_tracing:
+            tracemalloc.stop()
+
+
+def _profile_process(destination: str, memory: bool):
+    context = profile(memory)
+    prof = context.__enter__()
+
+    @atexit.register
+    def report():
+        context.__exit__(None, None, None)
+        if destination == '1':
+            print(prof, file=sys.stderr)
+        else:
+            prof.dump(destination)
+
+
+if os.environ.get(ENV_VAR):
+    _profile_process(os.environ[ENV_VAR], os.environ.get(ENV_VAR_MEMORY) == '1')
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import typing as tp
+from math import ceil, log2
+
+import numpy as np
+
+from .lazy import lazy_import
+
+if tp.TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.image import AxesImage
+
+mpl = lazy_import('matplotlib')
+
+
+__all__ = 'block_mean', 'block_max', 'ImagePyramid', 'PyramidView', 'REDUCTIONS'
+
+
+def _block_starts(n: int, factor: int):
+    return np.arange(0, n, factor)
+
+
+def block_mean(a: np.ndarray, factor: int) -> np.ndarray:
+    """Mean over blocks of ``factor x factor`` pixels (partial at the edges), ignoring ``nan``."""
+    valid = ~np.isnan(a) if a.dtype.kind in 'fc' else np.ones(a.shape, dtype=bool)
+    rows, cols = _block_starts(a.shape[0], factor), _block_starts(a.shape[1], factor)
+    s, n = (np.add.reduceat(np.add.reduceat(x, rows, axis=0, dtype=float), cols, axis=1)
+            for x in (np.where(valid, a, 0), valid))
+    with np.errstate(invalid='ignore'):
+        return s / n
+
+
+def block_max(a: np.ndarray, factor: int) -> np.ndarray:
+    """Maximum over blocks of ``factor x factor`` pixels (partial at the edges), ignoring ``nan``."""
+    return np.fmax.reduceat(np.fmax.reduceat(a, _block_starts(a.shape[0], factor), axis=0),
+                            _block_starts(a.shape[1], factor), axis=1)
+
+
+REDUCTIONS: tp.Dict[str, tp.Callable[[np.ndarray, int], np.ndarray]] = {
+    'mean': block_mean,
+    'max': block_max,
+}
+
+
+def _read(a) -> np.ndarray:
+    return np.ma.filled(a.astype(float), np.nan) if np.ma.isMaskedArray(a) else np.asarray(a)
+
+
+class ImagePyramid:
+    """Lazily computed mip-map levels of an image (of shape ``(H, W, ...)``).
+
+    Level ``k`` is reduced by a factor of ``2**k`` along both axes with one of
+    the `REDUCTIONS`. It is computed when first accessed, from the closest
+    finer level already computed, reading at most about `chunksize` elements
+    of it at a time, so that the full-resolution image (level 0) can be a
+    memory map. The levels of unmasked integer images are rounded to the
+    image's type.
+    """
+
+    chunksize = 2**24
+
+    def __init__(self, img, reduce: tp.Union[str, tp.Callable[[np.ndarray, int], np.ndarray]] = 'mean',
+                 chunksize: int = None):
+        self.reduce = REDUCTIONS[reduce] if isinstance(reduce, str) else reduce
+        if chunksize is not None:
+            self.chunksize = chunksize
+        self.levels: tp.Dict[int, np.ndarray] = {0: img}
+
+    @property
+    def shape(self) -> tp.Tuple[int, ...]:
+        return self.levels[0].shape
+
+    @property
+    def nlevels(self) -> int:
+        # down to a single pixel
+        return ceil(log2(max(self.shape[:2]))) + 1
+
+    def __len__(self):
+        return self.nlevels
+
+    def __getitem__(self, level: int) -> np.ndarray:
+        if level not in self.levels:
+            if not 0 <= level < self.nlevels:
+                raise IndexError(f'level {level} out of range for {self.nlevels} levels')
+            finer = max(lvl for lvl in self.levels if lvl < level)
+            self.levels[level] = self._reduce(self.levels[finer], 2**(level - finer))
+        return self.levels[level]
+
+    def _reduce(self, src, factor: int) -> np.ndarray:
+        rows = factor * max(1, self.chunksize // (factor * max(1, np.prod(src.shape[1:], dtype=int))))
+        level = np.concatenate([
+            self.reduce(_read(src[start:start + rows]), factor)
+            for start in range(0, len(src), rows)
+        ])
+        # keep integer (e.g. uint8 RGB) images in their range and type, as imshow interprets them by it
+        if src.dtype.kind in 'iu' and not np.ma.isMaskedArray(src):
+            level = np.rint(level, out=level).astype(src.dtype) if level.dtype.kind == 'f' else level.astype(src.dtype, copy=False)
+        return level
+
+    def limits(self) -> tp.Tuple[float, float]:
+        """The (``nan``-ignoring) minimum and maximum of the full-resolution image."""
+        img = self.levels[0]
+        rows = max(1, self.chunksize // max(1, np.prod(img.shape[1:], dtype=int)))
+        lims = np.array([(np.nanmin(chunk), np.nanmax(chunk))
+                         for start in range(0, len(img), rows)
+                         for chunk in [_read(img[start:start + rows])]])
+        return np.nanmin(lims[:, 0]).item(), np.nanmax(lims[:, 1]).item()
+
+
+class PyramidView:
+    """Shows on `ax` the level of `pyramid` that matches the resolution of the view.
+
+    Only the part of the level inside the view limits is given to the image,
+    so at any zoom matplotlib resamples about as many pixels as the axes has.
+    The level and crop are updated when the limits, the size or the DPI of
+    the figure change; call `update` after anything else that changes what
+    is visible.
+
+    Unless given a `norm`, or both `vmin` and `vmax`, the colour limits are
+    those of the full-resolution image, so they do not change with the level.
+    """
+
+    def __init__(self, ax: Axes, pyramid: ImagePyramid, extent=None, origin=None, **kwargs):
+        self.pyramid = pyramid
+        self.origin = mpl.rcParams['image.origin'] if origin is None else origin
+
+        h, w = pyramid.shape[:2]
+        self.extent = tuple(extent) if extent is not None else (
+            (-0.5, w - 0.5, h - 0.5, -0.5) if self.origin == 'upper' else (-0.5, w - 0.5, -0.5, h - 0.5)
+        )
+
+        norm = kwargs.get('norm')
+        if len(pyramid.shape) == 2 and not (norm is not None and norm.scaled()) and (
+                kwargs.get('vmin') is None or kwargs.get('vmax') is None):
+            vmin, vmax = pyramid.limits()
+            if norm is not None:
+                norm.vmin, norm.vmax = (vmin if norm.vmin is None else norm.vmin,
+                                        vmax if norm.vmax is None else norm.vmax)
+            else:
+                kwargs.update(vmin=vmin if kwargs.get('vmin') is None else kwargs['vmin'],
+                              vmax=vmax if kwargs.get('vmax') is None else kwargs['vmax'])
+
+        coarsest = len(pyramid) - 1
+        self.image: AxesImage = ax.imshow(pyramid[coarsest], extent=self.extent, origin=self.origin, **kwargs)
+        self._shown = coarsest, 0, 1, 0, 1
+
+        ax.callbacks.connect('xlim_changed', lambda _: self.update())
+        ax.callbacks.connect('ylim_changed', lambda _: self.update())
+        ax.figure.callbacks.connect('dpi_changed', lambda _: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda _: self.update())
+
+    def _pixels(self, lims, lo, hi, n):
+        # view limits to (fractional) full-resolution pixel indices along one axis
+        return np.clip(np.sort((np.asarray(lims, dtype=float) - lo) / (hi - lo) * n), 0, n)
+
+    def update(self):
+        ax = self.image.axes
+        h, w = self.pyramid.shape[:2]
+        left, right, bottom, top = self.extent
+        first, last = (top, bottom) if self.origin == 'upper' else (bottom, top)
+
+        c0, c1 = self._pixels(ax.get_xlim(), left, right, w)
+        r0, r1 = self._pixels(ax.get_ylim(), first, last, h)
+        density = max((c1 - c0) / max(ax.bbox.width, 1), (r1 - r0) / max(ax.bbox.height, 1), 1)
+        level = min(int(log2(density)), len(self.pyramid) - 1)
+        factor = 2**level
+
+        data = self.pyramid[level]
+        # whole pixels of the level, and one more on each side for the interpolation at the edges
+        c0, r0 = max(int(c0 // factor) - 1, 0), max(int(r0 // factor) - 1, 0)
+        c1, r1 = min(ceil(c1 / factor) + 1, data.shape[1]), min(ceil(r1 / factor) + 1, data.shape[0])
+        if (level, r0, r1, c0, c1) == self._shown:
+            return
+        self._shown = level, r0, r1, c0, c1
+
+        x0, x1 = (left + (right - left) * min(c * factor, w) / w for c in (c0, c1))
+        y0, y1 = (first + (last - first) * min(r * factor, h) / h for r in (r0, r1))
+        self.image.set_data(_read(data[r0:r1, c0:c1]))
+
+        # set_extent would autoscale to the crop
+        autoscale = ax.get_autoscalex_on(), ax.get_autoscaley_on()
+        ax.set_autoscale_on(False)
+        self.image.set_extent((x0, x1, y1, y0) if self.origin == 'upper' else (x0, x1, y0, y1))
+        ax.set_autoscalex_on(autoscale[0])
+        ax.set_autoscaley_on(autoscale[1])
+        self.image.sticky_edges.x[:] = left, right
+        self.image.sticky_edges.y[:] = bottom, top
@@ -0,0 +1,57 @@
+import typing as tp
+
+import numpy as np
+
+
+__all__ = 'StreamingLimits',
+
+
+class StreamingLimits:
+    """Minimum, maximum and approximate quantiles of a stream of arrays, in one pass.
+
+    Each array given to `update` is summarised by its quantiles at
+    `resolution` + 1 evenly spaced probabilities, weighted by its size.
+    Whenever there are more than `max_summaries` of them, they are merged
+    into one, so memory stays bounded however many arrays are seen.
+    Non-finite values are ignored.
+    """
+
+    resolution = 1024
+    max_summaries = 32
+
+    def __init__(self, quantiles: bool = True, resolution: int = None):
+        self.quantiles = quantiles
+        if resolution is not None:
+            self.resolution = resolution
+        self.probs = np.linspace(0, 1, self.resolution + 1)
+        self.min, self.max, self.count = np.inf, -np.inf, 0
+        self._summaries: tp.List[tp.Tuple[np.ndarray, int]] = []
+
+    def update(self, a) -> 'StreamingLimits':
+        a = np.ma.compressed(a) if np.ma.isMaskedArray(a) else np.ravel(a)
+        a = a[np.isfinite(a)]
+        if a.size:
+            self.min, self.max, self.count = min(self.min, a.min().item()), max(self.max, a.max().item()), self.count + a.size
+            if self.quantiles:
+                self._summaries.append((np.quantile(a, self.probs), a.size))
+                if len(self._summaries) > self.max_summaries:
+                    self._summaries = [(self._merged_quantiles(self.probs), self.count)]
+        return self
+
+    def _cdf(self):
+        # the size-weighted mixture of the piecewise linear CDFs of the summaries
+        xs = np.unique(np.concatenate([q for q, _ in self._summaries]))
+        cdf = sum(n * np.interp(xs, q, self.probs) for q, n in self._summaries) / self.count
+        return xs, cdf
+
+    def _merged_quantiles(self, q):
+        xs, cdf = self._cdf()
+        return np.interp(q, cdf, xs)
+
+    def quantile(self, q: tp.Union[float, tp.Sequence[float]]):
+        """Approximate quantiles (with `q` in ``[0, 1]``) of all values seen."""
+        if not self.quantiles:
+            raise ValueError('quantiles were not tracked')
+        if not self.count:
+            return np.full(np.shape(q), np.nan)[()]
+        return self._merged_quantiles(q)[()]